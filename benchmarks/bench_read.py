@@ -0,0 +1,229 @@
+"""Benchmark of the time and peak memory of reading xrdml files.
+
+Every target runs in a new process, so the peak resident memory (RSS) of one
+target does not hide the one of the next. Synthetic files of all measurement
+types are generated with `generate_xrdml.py` for the given sizes, or existing
+files can be passed. Run e.g.::
+
+    python benchmarks/bench_read.py --sizes 100KB 10MB 100MB
+    python benchmarks/bench_read.py my_map.xrdml --json new.json --compare old.json
+
+The peak RSS is only available on unix, it is reset before the target on linux.
+"""
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import os
+import sys
+import json
+import time
+import signal
+import shutil
+import tempfile
+import multiprocessing
+from argparse import ArgumentParser
+
+try:
+    from queue import Empty
+except ImportError:  # python 2
+    from Queue import Empty
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# the benchmarks and the xrdtools package of this repository
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from generate_xrdml import MEASUREMENT_TYPES, parse_size, write_xrdml  # noqa: E402
+
+TARGETS = ('validate_xrdml_schema', 'read_xrdml', 'read_xrdml(stream)', 'get_qmap')
+
+
+def _reset_peak_rss():
+    """Reset the peak RSS to the current RSS, only possible on linux."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except (IOError, OSError):
+        pass
+
+
+def _peak_rss_linux():
+    """Get the peak RSS since the last reset from /proc in bytes, or None."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (IOError, OSError):
+        return None
+
+
+def _peak_rss():
+    """Get the peak resident memory of the current process in bytes."""
+    rss = _peak_rss_linux()
+    if rss is not None:
+        return rss
+    if resource is None:
+        return float('nan')
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def _run(target, filename, queue):
+    """Run a target in a child process and put (seconds, peak RSS, base RSS) or the error message into `queue`."""
+    from xrdtools import read_xrdml
+    from xrdtools.io import validate_xrdml_schema
+    from xrdtools.utils import get_qmap
+
+    func = {'validate_xrdml_schema': lambda: validate_xrdml_schema(filename),
+            'read_xrdml': lambda: read_xrdml(filename),
+            'read_xrdml(stream)': lambda: read_xrdml(filename, stream=True)}.get(target)
+    if target == 'get_qmap':
+        data = read_xrdml(filename)
+        func = lambda: get_qmap(data)  # noqa: E731
+    # the imports may use more memory than small targets
+    _reset_peak_rss()
+    base = _peak_rss()
+    start = time.time()
+    try:
+        func()
+    except Exception as e:
+        # exceptions like lxml's XMLSyntaxError can not be pickled
+        queue.put(repr(e))
+        return
+    queue.put((time.time() - start, _peak_rss(), base))
+
+
+def _get_result(process, queue, timeout):
+    """Get the result of the child process, or None if it died or timed out."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            return queue.get(timeout=1)
+        except Empty:
+            if not process.is_alive():
+                break
+    # the result may have been put just before the process exited
+    try:
+        return queue.get(timeout=1)
+    except Empty:
+        return None
+
+
+def measure(target, filename, timeout=3600):
+    """
+    Measure a target in a new process.
+
+    Parameters
+    ----------
+    target : str
+        One of `TARGETS`.
+    filename : str
+        The filename of the xrdml file.
+    timeout : float, optional
+        The maximal time in seconds, the process is terminated afterwards
+        [Default: 3600].
+
+    Returns
+    -------
+    dict
+        The wall time 'time' in seconds, the peak RSS 'peak_rss' of the
+        process and its increase 'delta_rss' by the target in bytes.
+
+    Raises
+    ------
+    RuntimeError
+        If the target raised, the process died or timed out.
+    """
+    context = multiprocessing.get_context('spawn') if hasattr(multiprocessing, 'get_context') else multiprocessing
+    queue = context.Queue()
+    process = context.Process(target=_run, args=(target, filename, queue))
+    process.start()
+    try:
+        result = _get_result(process, queue, timeout)
+    finally:
+        process.join(1)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+    if result is None:
+        if process.exitcode == -getattr(signal, 'SIGTERM', 15):
+            raise RuntimeError('timeout after {} s'.format(timeout))
+        raise RuntimeError('the process exited with code {}'.format(process.exitcode))
+    if not isinstance(result, tuple):
+        raise RuntimeError(result)
+    seconds, peak, base = result
+    return {'time': seconds, 'peak_rss': peak, 'delta_rss': peak - base}
+
+
+def _generate(sizes, directory):
+    """Generate files of every measurement type for every size."""
+    filenames = []
+    for size in sizes:
+        for meas_type in sorted(MEASUREMENT_TYPES):
+            filename = os.path.join(directory, '{}_{}.xrdml'.format(meas_type, size))
+            write_xrdml(filename, meas_type, size=parse_size(size))
+            filenames.append(filename)
+    return filenames
+
+
+def main(argv=None):
+    parser = ArgumentParser('Benchmark the time and peak memory of reading xrdml files.')
+    parser.add_argument('filenames', nargs='*', help='xrdml files, generated files are used if none are given')
+    parser.add_argument('--sizes', nargs='+', default=['100KB', '10MB'],
+                        help='the sizes of the generated files')
+    parser.add_argument('--targets', nargs='+', choices=TARGETS, default=list(TARGETS),
+                        help='the benchmarked functions')
+    parser.add_argument('--timeout', type=float, default=3600, help='the maximal time of a target in seconds')
+    parser.add_argument('--json', default=None, help='save the results as json')
+    parser.add_argument('--compare', default=None, help='compare with the results of a json file')
+    args = parser.parse_args(argv)
+
+    directory = None
+    filenames = args.filenames
+    if not filenames:
+        directory = tempfile.mkdtemp(prefix='xrdtools-bench-')
+        filenames = _generate(args.sizes, directory)
+
+    previous = {}
+    if args.compare is not None:
+        with open(args.compare) as f:
+            previous = json.load(f)
+
+    results = {}
+    print('{:32s}{:>10s}{:22s}{:>10s}{:>12s}{:>12s}{:>9s}'.format(
+        'file', 'size [MB]', '  target', 'time [s]', 'peak [MB]', 'delta [MB]', 'ratio'))
+    try:
+        for filename in filenames:
+            name = os.path.basename(filename)
+            size = os.path.getsize(filename) / 2 ** 20
+            for target in args.targets:
+                if target == 'get_qmap' and 'area' not in name and directory is not None:
+                    continue
+                try:
+                    result = measure(target, filename, timeout=args.timeout)
+                except RuntimeError as e:
+                    print('{:32s}{:10.2f}  {:20s}  failed: {}'.format(name, size, target, e))
+                    continue
+                key = '{} {}'.format(name, target)
+                results[key] = result
+                ratio = ''
+                if key in previous:
+                    ratio = '{:9.2f}'.format(result['time'] / previous[key]['time'])
+                print('{:32s}{:10.2f}  {:20s}{:10.3f}{:12.1f}{:12.1f}{}'.format(
+                    name, size, target, result['time'], result['peak_rss'] / 2 ** 20,
+                    result['delta_rss'] / 2 ** 20, ratio))
+    finally:
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Micro-benchmark of the text decoders for the number lists of xrdml files.
+
+The decoders are compared on the lists of a xrdml file, by default the
+bundled `tests/test_area.xrdml`, whose scans have only 75 points, and on the
+lists of a synthetic long scan, like the multi-megabyte lists of a long line
+scan. Run e.g.::
+
+    python benchmarks/bench_txt_decode.py [filename] [--points 1000000]
+
+The speedup of the default 'vectorized' decoder over `np.fromstring` is
+0.9-1.0x on the lists of `tests/test_area.xrdml`, which are shorter than
+`_VECTORIZED_MIN_LENGTH` and are decoded by splitting the text, 2.5x on the
+attenuation factors, 1.7-2.3x on the fixed-decimal positions and 5x on the
+counts of a long scan.
+"""
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import os
+import sys
+import shutil
+import timeit
+import tempfile
+from argparse import ArgumentParser
+
+from lxml import etree
+
+# the benchmarks and the xrdtools package of this repository
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from generate_xrdml import write_xrdml  # noqa: E402
+from xrdtools.io import TEXT_DECODERS  # noqa: E402
+
+DECODERS = ['numpy', 'split', 'vectorized']
+
+
+def read_texts(filename, suffix=''):
+    """Get the number lists of a xrdml file by element name."""
+    tree = etree.parse(filename, etree.XMLParser(huge_tree=True)).getroot()
+    namespace = {'ns': tree.nsmap[None]}
+    texts = {}
+    for tag in ['intensities', 'beamAttenuationFactors', 'listPositions']:
+        txts = [uid.text for uid in tree.iterfind('.//ns:{}'.format(tag), namespaces=namespace)]
+        if txts:
+            texts[tag + suffix] = txts
+    return texts
+
+
+def main(argv=None):
+    default = os.path.join(os.path.dirname(__file__), '..', 'tests', 'test_area.xrdml')
+    parser = ArgumentParser('Compare the text decoders of xrdtools.')
+    parser.add_argument('filename', nargs='?', default=default, help='a xrdml file')
+    parser.add_argument('--points', type=int, default=1000000, help='the number of points of the long scan')
+    parser.add_argument('--repeat', type=int, default=5, help='the number of repetitions')
+    args = parser.parse_args(argv)
+
+    texts = read_texts(args.filename)
+    directory = tempfile.mkdtemp(prefix='xrdtools-bench-')
+    try:
+        filename = os.path.join(directory, 'scan.xrdml')
+        write_xrdml(filename, 'scan', nb_points=args.points)
+        texts.update(read_texts(filename, suffix=' (long scan)'))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    # the positions of a scan with a fixed number of decimals
+    step = 5.92 / args.points
+    texts['positions (long scan)'] = [' '.join('{:.4f}'.format(73.04 + k * step) for k in range(args.points))]
+
+    print('{:36s}{:>10s}'.format('text', 'length') + ''.join('{:>18s}'.format(name + ' [ms]') for name in DECODERS) +
+          '{:>10s}'.format('speedup'))
+    for name, txts in sorted(texts.items()):
+        times = {}
+        for decoder in DECODERS:
+            func = TEXT_DECODERS[decoder]
+            times[decoder] = min(timeit.repeat(lambda: [func(txt) for txt in txts], number=1, repeat=args.repeat))
+        length = sum(len(txt) for txt in txts) // len(txts)
+        columns = ''.join('{:18.3f}'.format(1e3 * times[decoder]) for decoder in DECODERS)
+        print('{:36s}{:10d}{}{:10.2f}'.format(name, length, columns, times['numpy'] / times['vectorized']))
+
+
+if __name__ == '__main__':
+    main()
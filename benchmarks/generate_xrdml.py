@@ -0,0 +1,137 @@
+"""Generator of synthetic xrdml files for benchmarks.
+
+The files are built from the header and the first scan of the test file
+`tests/test_area.xrdml`, so they conform to the bundled xml schemas. The
+scans are written one after the other, so files of several gigabytes can be
+generated with little memory. Run e.g.::
+
+    python benchmarks/generate_xrdml.py area.xrdml --type area --size 100MB
+    python benchmarks/generate_xrdml.py repeated.xrdml --type repeated --scans 1000 --points 750
+"""
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import io
+import os
+import re
+from argparse import ArgumentParser
+
+import numpy as np
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), '..', 'tests', 'test_area.xrdml')
+
+MEASUREMENT_TYPES = {'scan': 'Scan',
+                     'repeated': 'Repeated scan',
+                     'area': 'Area measurement'}
+
+_UNITS = {'KB': 2 ** 10, 'MB': 2 ** 20, 'GB': 2 ** 30}
+
+
+def parse_size(size):
+    """Parse a size like '500KB', '100MB' or '2GB' into bytes."""
+    match = re.match(r'^\s*([\d.]+)\s*([KMG]B)?\s*$', size.upper())
+    if match is None:
+        raise ValueError('Invalid size "{}".'.format(size))
+    return int(float(match.group(1)) * _UNITS.get(match.group(2), 1))
+
+
+def _read_template():
+    """Split the template file into the header, the first scan and the footer."""
+    with io.open(TEMPLATE, encoding='utf8') as f:
+        text = f.read()
+    start = text.index('\t\t<scan ')
+    end = text.index('</scan>', start) + len('</scan>\n')
+    footer = text[text.rindex('</scan>') + len('</scan>\n'):]
+    return text[:start], text[start:end], footer
+
+
+def _set_positions(scan, axis, start, end):
+    """Set the start and end position of `axis` in a scan."""
+    pattern = (r'(<positions axis="{}" unit="deg">\s*<startPosition>)[^<]*'
+               r'(</startPosition>\s*<endPosition>)[^<]*(</endPosition>)')
+    return re.sub(pattern.format(axis), r'\g<1>{:.4f}\g<2>{:.4f}\g<3>'.format(start, end), scan)
+
+
+def _intensities(rng, nb_points, center):
+    """Simulate the counts of a peak at the relative position `center` on a background."""
+    x = np.linspace(0, 1, nb_points)
+    rate = 5 + 2e4 * np.exp(-0.5 * ((x - center) / 0.01) ** 2)
+    return rng.poisson(rate)
+
+
+def write_xrdml(filename, meas_type='area', nb_scans=100, nb_points=1000, size=None, seed=0):
+    """
+    Write a synthetic xrdml file.
+
+    Parameters
+    ----------
+    filename : str
+        The filename of the xrdml file.
+    meas_type : {'scan', 'repeated', 'area'}, optional
+        The measurement type [Default: 'area'].
+    nb_scans : int, optional
+        The number of scans, always 1 for 'scan' [Default: 100].
+    nb_points : int, optional
+        The number of data points per scan [Default: 1000].
+    size : int or None, optional
+        The approximate file size in bytes. If given, scans are written
+        until the size is reached instead of `nb_scans` scans, for 'scan'
+        it sets the number of points [Default: None].
+    seed : int, optional
+        The seed of the simulated counts [Default: 0].
+    """
+    header, scan, footer = _read_template()
+    header = header.replace('measurementType="Area measurement"',
+                            'measurementType="{}"'.format(MEASUREMENT_TYPES[meas_type]))
+    if meas_type != 'area':
+        header = header.replace(' measurementStepAxis="Omega"', '')
+    if meas_type == 'scan':
+        nb_scans = 1
+        if size is not None:
+            # about 5 characters per attenuation factor and 4 per count
+            nb_points = max(1, (size - len(header) - len(scan)) // 9)
+    elif size is not None:
+        nb_scans = None
+
+    scan = re.sub(r'<beamAttenuationFactors>[^<]*</beamAttenuationFactors>',
+                  '<beamAttenuationFactors>{}</beamAttenuationFactors>'.format(' '.join(['1.00'] * nb_points)), scan)
+    scan = _set_positions(scan, '2Theta', 73.04, 78.96)
+    before, after = re.split(r'<intensities unit="counts">[^<]*</intensities>', scan)
+
+    rng = np.random.RandomState(seed)
+    with io.open(filename, 'w', encoding='utf8') as f:
+        f.write(header)
+        written = len(header) + len(footer)
+        k = 0
+        while (k < nb_scans) if nb_scans is not None else (k == 0 or written < size):
+            if meas_type == 'area':
+                omega = 16.5866 + 0.01 * k
+                before = _set_positions(before, 'Omega', omega, omega + 2.96)
+            # the peak moves from scan to scan in an area map
+            center = 0.5 + (0.1 * np.sin(0.01 * k) if meas_type == 'area' else 0)
+            intensities = '<intensities unit="counts">{}</intensities>'.format(
+                ' '.join(map(str, _intensities(rng, nb_points, center).tolist())))
+            for text in [before, intensities, after]:
+                f.write(text)
+                written += len(text)
+            k += 1
+        f.write(footer)
+
+
+def main(argv=None):
+    parser = ArgumentParser('Generate a synthetic xrdml file.')
+    parser.add_argument('filename', help='the filename of the xrdml file')
+    parser.add_argument('--type', choices=sorted(MEASUREMENT_TYPES), default='area',
+                        help='the measurement type')
+    parser.add_argument('--scans', type=int, default=100, help='the number of scans')
+    parser.add_argument('--points', type=int, default=1000, help='the number of points per scan')
+    parser.add_argument('--size', type=str, default=None,
+                        help='the approximate file size, e.g. 100MB, instead of the number of scans')
+    parser.add_argument('--seed', type=int, default=0, help='the seed of the simulated counts')
+    args = parser.parse_args(argv)
+
+    size = parse_size(args.size) if args.size is not None else None
+    write_xrdml(args.filename, args.type, nb_scans=args.scans, nb_points=args.points, size=size, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
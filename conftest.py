@@ -0,0 +1,6 @@
+import sys
+
+# modules with syntax of python 3.5 or newer, they are neither linted nor collected by older versions
+collect_ignore = []
+if sys.version_info < (3, 5):
+    collect_ignore.append('xrdtools/aio.py')
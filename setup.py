@@ -2,7 +2,9 @@
 import os
 import io
 import re
+import sys
 from setuptools import setup
+from setuptools.command.build_py import build_py as _build_py
 
 
 def read(*parts):
@@ -20,9 +22,24 @@ def find_version(*file_paths):
     raise RuntimeError("Unable to find version string.")
 
 
+# modules with syntax of python 3.5 or newer
+PY3_MODULES = [('xrdtools', 'aio')]
+
+
+class build_py(_build_py):
+    """Leave out the modules which can not be byte-compiled by python 2."""
+
+    def find_package_modules(self, package, package_dir):
+        modules = _build_py.find_package_modules(self, package, package_dir)
+        if sys.version_info < (3, 5):
+            modules = [m for m in modules if (m[0], m[1]) not in PY3_MODULES]
+        return modules
+
+
 requires = [
     'lxml>=3.0',
-    'numpy>=1.7',
+    'numpy>=1.16',
+    'futures>=3.0; python_version < "3"',
 ]
 
 
@@ -44,7 +61,8 @@ setup(
         'xrdtools': ['data/schemas/*.xsd'],
     },
     entry_points={
-        'console_scripts': ['xrdml = xrdtools.tools.clt:xrdml']
+        'console_scripts': ['xrdml = xrdtools.tools.clt:xrdml',
+                            'xrdtools = xrdtools.tools.clt:main']
     },
     url='https://github.com/paruch-group/xrdtools',
     keywords=['xrdml', 'read'],
@@ -65,5 +83,10 @@ setup(
         'Programming Language :: Python :: 3.6',
         'Topic :: Scientific/Engineering :: Physics',
     ],
+    cmdclass={'build_py': build_py},
     install_requires=requires,
+    extras_require={
+        'hdf5': ['h5py'],
+        'parquet': ['pyarrow'],
+    },
 )
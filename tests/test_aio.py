@@ -0,0 +1,82 @@
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import unittest
+
+import numpy as np
+
+from xrdtools import read_xrdml, read_xrdml_header
+
+try:
+    import asyncio
+    from xrdtools import aio
+except (ImportError, SyntaxError):  # python 2
+    aio = None
+
+
+@unittest.skipIf(aio is None, 'asyncio is not available')
+class TestAio(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.loader = aio.Loader(workers=2)
+
+    def tearDown(self):
+        self.loader.close()
+        self.loop.close()
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def collect(self, iterator):
+        results = []
+        while True:
+            try:
+                results.append(self.run_async(iterator.__anext__()))
+            except StopAsyncIteration:
+                return results
+
+    def test_read_xrdml(self):
+        data = self.run_async(aio.read_xrdml('tests/test_area.xrdml', loader=self.loader))
+        expected = read_xrdml('tests/test_area.xrdml')
+        self.assertEqual(sorted(data), sorted(expected))
+        for key in ['data', '2Theta', 'Omega']:
+            self.assertTrue(np.array_equal(data[key], expected[key]))
+
+        measurement = self.run_async(aio.read_measurement('tests/test_scan.xrdml', loader=self.loader))
+        self.assertTrue(np.array_equal(measurement['data'], read_xrdml('tests/test_scan.xrdml')['data']))
+
+        header = self.run_async(aio.read_xrdml_header('tests/test_scan.xrdml', loader=self.loader))
+        self.assertEqual(header, read_xrdml_header('tests/test_scan.xrdml'))
+
+    def test_iter_many(self):
+        filenames = ['tests/test_scan.xrdml', 'tests/test_area.xrdml', 'missing.xrdml'] * 2
+        results = self.collect(self.loader.iter_many(filenames))
+        self.assertEqual(sorted(filename for filename, _, _ in results), sorted(filenames))
+        for filename, data, error in results:
+            if filename == 'missing.xrdml':
+                self.assertIsNone(data)
+                self.assertIsInstance(error, ValueError)
+            else:
+                self.assertIsNone(error)
+                self.assertTrue(np.array_equal(data['data'], read_xrdml(filename)['data']))
+
+    def test_limit(self):
+        loader = aio.Loader(workers=1, limit=1)
+        try:
+            iterator = loader.iter_many(['tests/test_scan.xrdml'] * 5)
+            self.run_async(iterator.__anext__())
+            # only `limit` loads are pending at a time
+            self.assertLessEqual(len(iterator._pending), 1)
+            self.run_async(iterator.aclose())
+            self.assertEqual(self.collect(iterator), [])
+        finally:
+            loader.close()
+
+    def test_cancel(self):
+        task = self.loop.create_task(self.loader.read_xrdml('tests/test_area.xrdml'))
+        self.loop.call_soon(task.cancel)
+        with self.assertRaises(asyncio.CancelledError):
+            self.run_async(task)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+from __future__ import unicode_literals, print_function, division, absolute_import
+import os
+import time
+import threading
+
+import unittest
+
+from xrdtools import read_many, iter_many, scan_catalog
+from xrdtools.batch import _imap, _default_workers
+
+
+class TestReadMany(unittest.TestCase):
+    def setUp(self):
+        self.filenames = [os.path.abspath('tests/test_scan.xrdml'),
+                          os.path.abspath('tests/missing.xrdml'),
+                          os.path.abspath('tests/test_area.xrdml')]
+
+    def test_read_many(self):
+        for executor in ['thread', 'process']:
+            data, errors = read_many(self.filenames, workers=2, executor=executor)
+
+            self.assertEqual(len(data), 3)
+            self.assertEqual(data[0]['measType'], 'Scan')
+            self.assertIsNone(data[1])
+            self.assertEqual(data[2]['measType'], 'Area measurement')
+            self.assertEqual(list(errors.keys()), [self.filenames[1]])
+            self.assertIsInstance(errors[self.filenames[1]], ValueError)
+
+    def test_iter_many(self):
+        results = {filename: (data, error) for filename, data, error
+                   in iter_many(self.filenames, workers=1, validate='off')}
+
+        self.assertEqual(sorted(results.keys()), sorted(self.filenames))
+        self.assertIsNotNone(results[self.filenames[1]][1])
+        self.assertEqual(results[self.filenames[0]][0]['sample'], 'B10135')
+
+    def test_imap_window(self):
+        calls = []
+        lock = threading.Lock()
+
+        def square(k):
+            with lock:
+                calls.append(k)
+            return k ** 2
+
+        for ordered in [True, False]:
+            del calls[:]
+            results = _imap(square, list(range(20)), workers=2, executor='thread', ordered=ordered)
+            first = [next(results)]
+            time.sleep(0.1)
+            # only twice as many items as workers are submitted
+            self.assertLessEqual(len(calls), 4)
+            results = first + list(results)
+            self.assertEqual(sorted(k for k, _, _ in results), list(range(20)))
+            self.assertTrue(all(result == k ** 2 and error is None for k, result, error in results))
+            if ordered:
+                self.assertEqual([k for k, _, _ in results], list(range(20)))
+
+        # without workers, the window follows the default of the executor
+        del calls[:]
+        results = _imap(square, list(range(200)), executor='thread')
+        first = [next(results)]
+        time.sleep(0.1)
+        self.assertLessEqual(len(calls), 2 * _default_workers('thread'))
+        self.assertEqual(len(first + list(results)), 200)
+
+    def test_scan_catalog(self):
+        rows, errors = scan_catalog('tests', workers=2)
+        self.assertEqual([row['filename'] for row in rows], [self.filenames[2], self.filenames[0]])
+        self.assertEqual([row['measType'] for row in rows], ['Area measurement', 'Scan'])
+        self.assertEqual(errors, {})
+
+        rows, errors = scan_catalog(self.filenames, workers=1)
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(list(errors.keys()), [self.filenames[1]])
+
+    def test_unknown_executor(self):
+        with self.assertRaises(ValueError):
+            read_many(self.filenames, executor='cluster')
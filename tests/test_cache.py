@@ -0,0 +1,112 @@
+from __future__ import unicode_literals, print_function, division, absolute_import
+import os
+import shutil
+import tempfile
+
+import unittest
+
+import numpy as np
+
+from xrdtools import read_xrdml
+from xrdtools import cache
+
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.filename = os.path.abspath('tests/test_area.xrdml')
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_read_xrdml_cached(self):
+        data = read_xrdml(self.filename)
+        self.assertEqual(cache.stats(self.cache_dir)['entries'], 0)
+
+        for _ in range(2):
+            cached = read_xrdml(self.filename, cache_dir=self.cache_dir)
+            self.assertEqual(list(cached.keys()), list(data.keys()))
+            for key in data:
+                if isinstance(data[key], np.ndarray):
+                    self.assertEqual(cached[key].shape, data[key].shape)
+                    self.assertTrue((cached[key] == data[key]).all())
+                else:
+                    self.assertEqual(cached[key], data[key])
+            self.assertEqual(cache.stats(self.cache_dir)['entries'], 1)
+
+        # copy-on-write arrays do not change the cache
+        cached['data'][:] = 0
+        cached = read_xrdml(self.filename, cache_dir=self.cache_dir)
+        self.assertTrue((cached['data'] == data['data']).all())
+
+    def test_content_key(self):
+        copy = os.path.join(self.cache_dir, 'copy.xrdml')
+        shutil.copy(self.filename, copy)
+        self.assertEqual(cache.get_key(self.filename, method='content'), cache.get_key(copy, method='content'))
+        self.assertNotEqual(cache.get_key(self.filename), cache.get_key(copy))
+
+    def test_evict(self):
+        read_xrdml(self.filename, cache_dir=os.path.join(self.cache_dir, 'area'))
+        size = cache.stats(os.path.join(self.cache_dir, 'area'))['size']
+
+        # the least recently used entry is removed first
+        cache_dir = os.path.join(self.cache_dir, 'cache')
+        read_xrdml(os.path.abspath('tests/test_scan.xrdml'), cache_dir=cache_dir)
+        self.assertEqual(cache.stats(cache_dir)['entries'], 1)
+        read_xrdml(self.filename, cache_dir=cache_dir, cache_size=size)
+        self.assertEqual(cache.stats(cache_dir), {'cache_dir': cache_dir, 'entries': 1, 'size': size})
+
+        self.assertEqual(cache.clear(cache_dir), 1)
+        self.assertEqual(cache.stats(cache_dir)['entries'], 0)
+
+
+class TestMemoryCache(unittest.TestCase):
+    def setUp(self):
+        cache.memory_cache.clear()
+        self.filename = os.path.abspath('tests/test_area.xrdml')
+
+    def tearDown(self):
+        cache.memory_cache.clear()
+
+    def test_read_xrdml_memory_cache(self):
+        data = read_xrdml(self.filename, memory_cache=True)
+        cached = read_xrdml(self.filename, memory_cache=True)
+
+        self.assertTrue((cached['data'] == data['data']).all())
+        self.assertFalse(cached['data'].flags.writeable)
+        with self.assertRaises(ValueError):
+            cached['data'][0, 0] = 0
+        cached['hkl']['h'] = 10
+        self.assertEqual(read_xrdml(self.filename, memory_cache=True)['hkl']['h'], 0)
+        # the views can not be made writeable again
+        with self.assertRaises(ValueError):
+            cached['data'].flags.writeable = True
+        with self.assertRaises(ValueError):
+            data['data'].flags.writeable = True
+
+        stats = cache.memory_cache.stats()
+        self.assertEqual((stats['entries'], stats['hits'], stats['misses']), (1, 2, 1))
+
+    def test_evictions(self):
+        memory_cache = cache.MemoryCache(max_size=150000)
+        for filename in ['tests/test_scan.xrdml', 'tests/test_area.xrdml', 'tests/test_scan.xrdml']:
+            key = memory_cache.get_key(filename)
+            if memory_cache.get(key) is None:
+                memory_cache.put(key, read_xrdml(filename))
+
+        stats = memory_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (0, 3, 2))
+        self.assertLessEqual(stats['size'], 150000)
+
+        memory_cache.clear()
+        self.assertEqual(memory_cache.stats()['entries'], 0)
+
+    def test_nbytes(self):
+        value = np.arange(1000.)
+        # a broadcast view holds the memory of its single value, shared arrays are counted once
+        data = {'data': value, 'x': value, 'time': np.broadcast_to(np.array(2.), (1000, 1000)), 'rows': [value[:10]]}
+        self.assertEqual(cache._nbytes(data), 8008)
+
+        data = read_xrdml('tests/test_scan.xrdml', broadcast=True)
+        self.assertLess(cache._nbytes(data), sum(value.nbytes for value in data.values()
+                                                 if isinstance(value, np.ndarray)))
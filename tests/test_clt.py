@@ -0,0 +1,93 @@
+from __future__ import unicode_literals, print_function, division, absolute_import
+import os
+import io
+import sys
+import shutil
+import tempfile
+
+import unittest
+
+from xrdtools.tools.clt import xrdml, main
+
+
+class TestXrdmlExport(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filenames = []
+        for filename in ['test_scan.xrdml', 'test_area.xrdml']:
+            shutil.copy(os.path.join('tests', filename), self.tmpdir)
+            self.filenames.append(os.path.join(self.tmpdir, filename))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _read_outputs(self):
+        outputs = []
+        for filename in self.filenames:
+            with io.open(filename.replace('.xrdml', '.txt')) as f:
+                outputs.append(f.read())
+        return outputs
+
+    def test_export_txt(self):
+        xrdml(self.filenames)
+        expected = self._read_outputs()
+        self.assertTrue(expected[0].startswith('# 2Theta-Omega\tIntensity\n'))
+        self.assertEqual(len(expected[1].splitlines()), 5701)
+
+        xrdml(self.filenames + ['--stream', '--chunk-size', '1000', '--jobs', '2'])
+        self.assertEqual(self._read_outputs(), expected)
+
+    def test_export_txt_fmt(self):
+        # one format per column
+        fmt = ['--fmt', '%.2f\t%.4e']
+        filename_txt = self.filenames[0].replace('.xrdml', '.txt')
+        xrdml(self.filenames[:1] + fmt)
+        with io.open(filename_txt) as f:
+            expected = f.read()
+        self.assertEqual(expected.splitlines()[1].count('e'), 1)
+
+        xrdml(self.filenames[:1] + fmt + ['--stream', '--chunk-size', '100'])
+        with io.open(filename_txt) as f:
+            self.assertEqual(f.read(), expected)
+
+    def test_export_stdout(self):
+        stdout = sys.stdout
+        try:
+            for jobs in ['1', '2']:
+                sys.stdout = io.StringIO()
+                xrdml(self.filenames[:1] + ['--output', 'stdout', '--jobs', jobs])
+                lines = sys.stdout.getvalue().splitlines()
+                self.assertEqual(len(lines), 751)
+        finally:
+            sys.stdout = stdout
+
+    def test_output_filename(self):
+        filename = os.path.join(self.tmpdir, 'SCAN.XRDML')
+        os.rename(self.filenames[0], filename)
+        with io.open(filename, 'rb') as f:
+            content = f.read()
+        xrdml([filename])
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir, 'SCAN.txt')))
+
+        # the input file is not overwritten
+        filename_txt = os.path.join(self.tmpdir, 'scan.txt')
+        shutil.copy(filename, filename_txt)
+        with self.assertRaises(SystemExit):
+            xrdml([filename_txt])
+        with io.open(filename_txt, 'rb') as f:
+            self.assertEqual(f.read(), content)
+
+
+class TestCatalog(unittest.TestCase):
+    def test_catalog(self):
+        stdout = sys.stdout
+        sys.stdout = io.StringIO()
+        try:
+            main(['catalog', 'tests', '--jobs', '1', '--delimiter', ','])
+            lines = sys.stdout.getvalue().splitlines()
+        finally:
+            sys.stdout = stdout
+        self.assertEqual(lines[0], 'filename,sample,status,measType,scanAxis,stepAxis,kType,Lambda,substrate,hkl')
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].endswith(',B11091,Completed,Area measurement,Omega-2Theta,Omega,K-Alpha 1,'
+                                          '1.540598,SrTiO3,0 1 3'))
@@ -0,0 +1,52 @@
+from __future__ import unicode_literals, print_function, division, absolute_import
+import os
+import json
+import shutil
+import tempfile
+
+import unittest
+
+import numpy as np
+
+from xrdtools import read_xrdml
+from xrdtools import export
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.data = read_xrdml(os.path.abspath('tests/test_area.xrdml'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_npz(self):
+        filename = os.path.join(self.tmpdir, 'test_area.npz')
+        export.to_npz(self.data, filename)
+
+        npz = np.load(filename)
+        self.assertTrue((npz['data'] == self.data['data']).all())
+        self.assertTrue((npz['Omega'] == self.data['Omega']).all())
+        self.assertEqual(npz['hkl'].tolist(), [0, 1, 3])
+        self.assertEqual(npz['Lambda'], self.data['Lambda'])
+        self.assertEqual(str(npz['scanAxis']), 'Omega-2Theta')
+        self.assertEqual(str(npz['stepAxis']), 'Omega')
+
+    @unittest.skipIf(export.h5py is None, 'h5py is not installed')
+    def test_hdf5(self):
+        filename = os.path.join(self.tmpdir, 'test_area.h5')
+        export.to_hdf5(self.data, filename)
+
+        with export.h5py.File(filename, 'r') as f:
+            self.assertTrue((f['2Theta'][()] == self.data['2Theta']).all())
+            self.assertEqual(f.attrs['substrate'], 'SrTiO3')
+            self.assertEqual(f.attrs['kAlpha2'], self.data['kAlpha2'])
+
+    @unittest.skipIf(export.pyarrow is None, 'pyarrow is not installed')
+    def test_parquet(self):
+        filename = os.path.join(self.tmpdir, 'test_area.parquet')
+        export.to_parquet(self.data, filename)
+
+        table = export.pyarrow.parquet.read_table(filename)
+        self.assertTrue((table.column('data').to_numpy() == self.data['data'].ravel()).all())
+        self.assertEqual(json.loads(table.schema.metadata[b'hkl']), [0, 1, 3])
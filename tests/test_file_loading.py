@@ -1,9 +1,26 @@
 from __future__ import unicode_literals, print_function, division, absolute_import
+import io
 import os
+import re
+import bz2
+import gzip
+import zlib
+import shutil
+import zipfile
+import tempfile
 
 import unittest
 
-from xrdtools import read_xrdml
+try:
+    import tracemalloc
+except ImportError:  # python 2
+    tracemalloc = None
+
+import numpy as np
+from lxml import etree
+
+from xrdtools import read_xrdml, read_measurement
+from xrdtools import io as xrdio
 from xrdtools.io import validate_xrdml_schema
 
 
@@ -14,6 +31,15 @@ class TestXrdmlRead(unittest.TestCase):
         version = validate_xrdml_schema(filename)
         self.assertEqual(version, 1.0)
 
+    def test_schema_cache(self):
+        filename = os.path.abspath('tests/test_area.xrdml')
+
+        validate_xrdml_schema(filename)
+        # only the schema of the declared version needs to be compiled
+        self.assertIn(1.0, xrdio._schema_cache)
+        schema = xrdio._get_schema(1.0)
+        self.assertIs(schema, xrdio._get_schema(1.0))
+
     def test_read_xrdml_scan(self):
         filename = os.path.abspath('tests/test_scan.xrdml')
 
@@ -125,3 +151,263 @@ class TestXrdmlRead(unittest.TestCase):
                 'time', 'kAlphaRatio']
         for key in keys:
             self.assertIn(key, data.keys())
+
+    def test_read_xrdml_area_grid(self):
+        # an Omega / 2Theta map with one 2Theta position per scan
+        with io.open('tests/test_area.xrdml', encoding='utf8') as f:
+            text = f.read()
+        text = text.replace('scanAxis="Omega-2Theta"', 'scanAxis="Omega"')
+        text = text.replace('measurementStepAxis="Omega"', 'measurementStepAxis="2Theta"')
+        positions = iter(np.linspace(73., 74., 76))
+        text = re.sub('<positions axis="2Theta" unit="deg">.*?</positions>',
+                      lambda m: '<positions axis="2Theta" unit="deg"><commonPosition>{:.4f}</commonPosition>'
+                                '</positions>'.format(next(positions)), text, flags=re.S)
+        tmp = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmp, 'map.xrdml')
+            with io.open(filename, 'w', encoding='utf8') as f:
+                f.write(text)
+
+            data = read_xrdml(filename)
+            for key in ['2Theta', 'Omega']:
+                self.assertEqual(data[key].shape, data['data'].shape)
+            self.assertTrue(data['2Theta'].flags.writeable)
+            self.assertTrue((data['2Theta'] == np.round(np.linspace(73., 74., 76), 4)[:, None]).all())
+
+            measurement = read_measurement(filename)
+            self.assertEqual(measurement['2Theta'].strides[1], 0)
+            self.assertTrue((measurement['2Theta'] == data['2Theta']).all())
+        finally:
+            shutil.rmtree(tmp)
+
+    def test_read_xrdml_header(self):
+        for filename in ['tests/test_scan.xrdml', 'tests/test_area.xrdml']:
+            data = read_xrdml(filename)
+            header = xrdio.read_xrdml_header(filename)
+            for key in ['filename', 'sample', 'status', 'measType', 'scanAxis', 'kType', 'kAlpha1', 'kAlpha2',
+                        'kBeta', 'kAlphaRatio', 'Lambda']:
+                self.assertEqual(header[key], data[key])
+            self.assertEqual(header['stepAxis'], data.get('stepAxis'))
+        self.assertEqual(header['substrate'], 'SrTiO3')
+        self.assertEqual(header['hkl'], {'h': 0, 'k': 1, 'l': 3})
+
+    def test_read_xrdml_validate(self):
+        filename = os.path.abspath('tests/test_scan.xrdml')
+
+        data = read_xrdml(filename)
+        for validate in ['namespace-only', 'off']:
+            data_fast = read_xrdml(filename, validate=validate)
+            self.assertEqual(data_fast['sample'], data['sample'])
+            self.assertTrue((data_fast['data'] == data['data']).all())
+
+        with self.assertRaises(ValueError):
+            read_xrdml(filename, validate='partial')
+
+    def test_assemble_scans(self):
+        filename = os.path.abspath('tests/test_area.xrdml')
+        tree = etree.parse(filename).getroot()
+        namespace = {'ns': tree.nsmap[None]}
+        uid_scans = tree.findall('ns:xrdMeasurement/ns:scan', namespaces=namespace)
+
+        scans = [xrdio._get_scan_data(uid_scans, k, namespace=namespace) for k in range(len(uid_scans))]
+        for nb_scans in [len(scans), None]:
+            arrays = xrdio._assemble_scans(enumerate(scans), nb_scans)
+            for key in ['data', 'time', '2Theta', 'Omega', 'Phi']:
+                expected = np.vstack([scan[key] for scan in scans])
+                self.assertEqual(arrays[key].shape, expected.shape)
+                self.assertTrue((arrays[key] == expected).all())
+
+        uniform = {}
+        arrays = xrdio._assemble_scans(enumerate(scans), uniform=uniform)
+        for key in ['data', 'time', '2Theta', 'Omega', 'Phi']:
+            self.assertEqual(uniform[key], bool(np.all(arrays[key] == arrays[key][0])))
+
+    @unittest.skipIf(tracemalloc is None, 'tracemalloc requires python 3')
+    def test_assemble_scans_memory(self):
+        nb_scans, nb_points = 1000, 500
+
+        def scans():
+            for k in range(nb_scans):
+                yield k, {'data': np.full(nb_points, k, dtype=float), '2Theta': np.linspace(70, 80, nb_points)}
+
+        tracemalloc.start()
+        try:
+            arrays = xrdio._assemble_scans(scans())
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        nbytes = sum(arr.nbytes for arr in arrays.values())
+        self.assertEqual(arrays['data'].shape, (nb_scans, nb_points))
+        self.assertTrue((arrays['data'][:, 0] == np.arange(nb_scans)).all())
+        # the arrays grow in place without copies of the stacked rows
+        self.assertLess(peak, 1.3 * nbytes)
+
+    def test_read_xrdml_broadcast(self):
+        data = read_xrdml('tests/test_scan.xrdml')
+        data_broadcast = read_xrdml('tests/test_scan.xrdml', broadcast=True)
+
+        time = data_broadcast['time']
+        self.assertEqual(time.shape, data['time'].shape)
+        self.assertEqual(time.strides, (0,))
+        self.assertFalse(time.flags.writeable)
+        self.assertTrue((time == data['time']).all())
+        self.assertTrue(data['time'].flags.writeable)
+
+    def test_read_xrdml_stream(self):
+        for filename in ['tests/test_scan.xrdml', 'tests/test_area.xrdml']:
+            data = read_xrdml(os.path.abspath(filename))
+            data_stream = read_xrdml(os.path.abspath(filename), stream=True)
+
+            self.assertEqual(sorted(data.keys()), sorted(data_stream.keys()))
+            for key in ['data', '2Theta', 'Omega', 'time']:
+                self.assertTrue((data[key] == data_stream[key]).all())
+            for key in ['sample', 'measType', 'scanAxis', 'scannb', 'xunit', 'Lambda']:
+                self.assertEqual(data[key], data_stream[key])
+
+    def test_iter_scans(self):
+        filename = os.path.abspath('tests/test_area.xrdml')
+        data = read_xrdml(filename)
+
+        scans = list(xrdio.iter_scans(filename))
+        self.assertEqual([scan['scannb'] for scan in scans], data['scannb'])
+        for k, scan in enumerate(scans):
+            self.assertEqual(scan['status'], 'Completed')
+            self.assertEqual(scan['scanAxis'], 'Omega-2Theta')
+            self.assertTrue((scan['data'] == data['data'][k]).all())
+            self.assertTrue((scan['2Theta'] == data['2Theta'][k]).all())
+
+    def test_text_decoders(self):
+        texts = [' '.join(str(k % 997) for k in range(5000)),
+                 ' '.join(['1.00'] * 2000),
+                 '\n'.join('{:.4f}'.format(73.04 + k * 0.0123) for k in range(2000)),
+                 ' '.join('{:07.3f}'.format(k * 0.0371 - 20) for k in range(2000)),
+                 ' '.join('{:.3f}'.format(k * 0.0371 - 20) for k in range(2000)),
+                 '73.0400 -0.4 9.695 .5 1e3',
+                 '12 345 6789']
+        for txt in texts:
+            expected = np.array([float(number) for number in txt.split()])
+            for decoder in ['numpy', 'split', 'vectorized']:
+                decoded = xrdio.TEXT_DECODERS[decoder](txt)
+                self.assertEqual(decoded.dtype, expected.dtype)
+                self.assertTrue((decoded == expected).all())
+        for txt in [' '.join(['1 - 2'] * 1000), ' '.join(['1.2.3'] * 1000)]:
+            with self.assertRaises(ValueError):
+                xrdio.TEXT_DECODERS['vectorized'](txt)
+
+        previous = xrdio.set_text_decoder('numpy')
+        try:
+            self.assertEqual(xrdio._txt_list2arr('1 2 3').tolist(), [1., 2., 3.])
+        finally:
+            xrdio.set_text_decoder(previous)
+        with self.assertRaises(ValueError):
+            xrdio.set_text_decoder('unknown')
+
+
+class TestXrdmlSources(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        with open('tests/test_area.xrdml', 'rb') as f:
+            self.content = f.read()
+        self.expected = read_xrdml('tests/test_area.xrdml')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def check(self, data):
+        for key in ['data', '2Theta', 'Omega', 'time']:
+            self.assertTrue(np.array_equal(data[key], self.expected[key]))
+        self.assertEqual(data['measType'], self.expected['measType'])
+
+    def test_compressed_files(self):
+        filenames = {'gzip': os.path.join(self.tmpdir, 'area.xrdml.gz'),
+                     'bz2': os.path.join(self.tmpdir, 'area.xrdml.bz2')}
+        with gzip.GzipFile(filenames['gzip'], 'wb') as f:
+            f.write(self.content)
+        with open(filenames['bz2'], 'wb') as f:
+            f.write(bz2.compress(self.content))
+        for filename in filenames.values():
+            for stream in [False, True]:
+                data = read_xrdml(filename, stream=stream)
+                self.check(data)
+                self.assertEqual(data['filename'], filename)
+            self.assertEqual(validate_xrdml_schema(filename), 1.0)
+            self.assertEqual(xrdio.read_xrdml_header(filename)['measType'], 'Area measurement')
+
+    def test_stream_decompressor(self):
+        # the decompression of python 2, which can not seek in the stream
+        buf = io.BytesIO()
+        with gzip.GzipFile(fileobj=buf, mode='wb') as f:
+            f.write(self.content)
+        compressed = [(buf.getvalue(), zlib.decompressobj(16 + zlib.MAX_WBITS)),
+                      (bz2.compress(self.content), bz2.BZ2Decompressor())]
+        for data, decompressor in compressed:
+            stream = xrdio._StreamDecompressor(io.BytesIO(data), decompressor)
+            self.assertEqual(b''.join(iter(lambda: stream.read(1000), b'')), self.content)
+
+    def test_zip_file(self):
+        filename = os.path.join(self.tmpdir, 'bundle.zip')
+        with zipfile.ZipFile(filename, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('area.xrdml', self.content)
+        self.check(read_xrdml(filename))
+
+        with zipfile.ZipFile(filename, 'a') as archive:
+            archive.writestr('other.xrdml', self.content)
+        with self.assertRaises(ValueError):
+            read_xrdml(filename)
+        with zipfile.ZipFile(filename) as archive:
+            self.check(read_xrdml(archive.open('other.xrdml'), stream=True))
+
+    def test_huge_text_node(self):
+        # a text node longer than 10 MB, like the intensities of a long scan
+        end = self.content.index(b'</intensities>')
+        filename = os.path.join(self.tmpdir, 'huge.xrdml')
+        with open(filename, 'wb') as f:
+            f.write(self.content[:end] + b' ' * (11 * 2 ** 20) + self.content[end:])
+        for stream in [False, True]:
+            self.check(read_xrdml(filename, stream=stream))
+        self.assertEqual(validate_xrdml_schema(filename), 1.0)
+        self.assertEqual(xrdio.read_xrdml_header(filename)['measType'], 'Area measurement')
+
+    def test_bytes_and_file_objects(self):
+        # bytes are filenames in python 2
+        self.check(read_xrdml(self.content if bytes is not str else bytearray(self.content)))
+        compressed = io.BytesIO()
+        with gzip.GzipFile(fileobj=compressed, mode='wb') as f:
+            f.write(self.content)
+        compressed.seek(0)
+        self.check(read_xrdml(compressed, stream=True))
+        self.assertEqual(validate_xrdml_schema(io.BytesIO(self.content)), 1.0)
+        with open('tests/test_area.xrdml', 'rb') as f:
+            measurement = read_measurement(f)
+            self.assertFalse(f.closed)
+        self.assertTrue(np.array_equal(measurement['data'], self.expected['data']))
+        self.assertEqual(len(list(xrdio.iter_scans(io.BytesIO(self.content)))), len(self.expected['scannb']))
+
+        with self.assertRaises(ValueError):
+            read_xrdml(io.BytesIO(self.content), cache_dir=self.tmpdir)
+        with self.assertRaises(TypeError):
+            read_xrdml(1)
+
+    def test_short_reads(self):
+        class ShortReader(io.RawIOBase):
+            # returns at most 100 bytes per read, like a pipe or a socket
+            def __init__(self, content):
+                io.RawIOBase.__init__(self)
+                self.buf = io.BytesIO(content)
+
+            def readable(self):
+                return True
+
+            def readinto(self, b):
+                data = self.buf.read(min(len(b), 100))
+                b[:len(data)] = data
+                return len(data)
+
+        for stream in [False, True]:
+            self.check(read_xrdml(io.BufferedReader(ShortReader(self.content)), stream=stream))
+        self.assertEqual(len(list(xrdio.iter_scans(ShortReader(self.content)))), len(self.expected['scannb']))
+
+        # a prolog longer than the buffer of the stream
+        start = self.content.index(b'?>') + len(b'?>')
+        content = self.content[:start] + b'<!--' + b' ' * (2 * xrdio._BUFFER_SIZE) + b'-->' + self.content[start:]
+        self.check(read_xrdml(io.BytesIO(content), stream=True))
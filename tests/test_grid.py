@@ -0,0 +1,58 @@
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import unittest
+
+import numpy as np
+
+from xrdtools import read_xrdml
+from xrdtools.grid import regrid, get_qgrid
+from xrdtools.utils import get_qmap
+
+
+class TestRegrid(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.x = rng.uniform(-1, 1, 5000)
+        self.y = rng.uniform(0, 2, 5000)
+        self.values = rng.uniform(0, 10, 5000)
+
+    def test_histogram(self):
+        grid, x_edges, y_edges = regrid(self.x, self.y, self.values, bins=(20, 10))
+        sums, _, _ = np.histogram2d(self.x, self.y, bins=[x_edges, y_edges], weights=self.values)
+        counts, _, _ = np.histogram2d(self.x, self.y, bins=[x_edges, y_edges])
+        self.assertEqual(grid.shape, (20, 10))
+        np.testing.assert_allclose(grid, sums / counts)
+
+        chunked = regrid(self.x, self.y, self.values, bins=(20, 10), chunk_size=100)[0]
+        np.testing.assert_allclose(chunked, grid)
+
+    def test_empty_bins(self):
+        grid = regrid(self.x, self.y, self.values, bins=4, range=((0, 2), (0, 2)))[0]
+        self.assertTrue(np.isnan(grid[2:]).all())
+        self.assertFalse(np.isnan(grid[:2]).any())
+
+    def test_bilinear(self):
+        grid = regrid(self.x, self.y, np.full(5000, 3.), bins=8, method='bilinear')[0]
+        np.testing.assert_allclose(grid, 3.)
+        self.assertRaises(ValueError, regrid, self.x, self.y, self.values, method='cubic')
+
+
+class TestQGrid(unittest.TestCase):
+    def test_get_qgrid(self):
+        data = read_xrdml('tests/test_area.xrdml')
+        kpar, kperp = get_qmap(data)
+
+        grid, x_edges, y_edges = get_qgrid(data, bins=(50, 40))
+        self.assertAlmostEqual(x_edges[0], kpar.min())
+        self.assertAlmostEqual(y_edges[-1], kperp.max())
+        expected = regrid(kpar, kperp, data['data'], bins=(50, 40))[0]
+        np.testing.assert_allclose(grid, expected)
+        np.testing.assert_allclose(get_qgrid(data, bins=(50, 40), chunk_size=300)[0], expected)
+
+        grid, x_edges, y_edges = get_qgrid(data, bins=30, space='hkl', method='bilinear')
+        self.assertEqual(grid.shape, (30, 30))
+        self.assertTrue(0 < x_edges[-1] < 2 and 2 < y_edges[-1] < 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+from __future__ import unicode_literals, print_function, division, absolute_import
+import pickle
+
+import unittest
+
+import numpy as np
+
+from xrdtools import read_xrdml, read_measurement, Measurement
+
+
+class TestMeasurement(unittest.TestCase):
+    def test_constant_axes(self):
+        measurement = read_measurement('tests/test_scan.xrdml')
+        self.assertIsInstance(measurement, Measurement)
+        self.assertTrue(measurement.is_constant('time'))
+        self.assertFalse(measurement.is_constant('2Theta'))
+        self.assertEqual(measurement.constant('time'), read_xrdml('tests/test_scan.xrdml')['time'][0])
+        self.assertRaises(ValueError, measurement.constant, '2Theta')
+
+        time = measurement['time']
+        self.assertEqual(time.shape, measurement.shape)
+        self.assertFalse(time.flags.writeable)
+        self.assertEqual(time.strides, (0,))
+        self.assertEqual(measurement.measType, 'Scan')
+        self.assertRaises(AttributeError, getattr, measurement, 'foo')
+
+    def test_to_dict(self):
+        for filename in ['tests/test_scan.xrdml', 'tests/test_area.xrdml']:
+            data = read_xrdml(filename)
+            measurement = read_measurement(filename)
+            self.assertEqual(sorted(measurement.keys()), sorted(data.keys()))
+
+            compat = measurement.to_dict()
+            self.assertEqual(sorted(compat.keys()), sorted(data.keys()))
+            for key in data:
+                if isinstance(data[key], np.ndarray):
+                    self.assertEqual(compat[key].dtype, data[key].dtype)
+                    np.testing.assert_array_equal(compat[key], data[key])
+                    np.testing.assert_array_equal(measurement[key], data[key])
+                else:
+                    self.assertEqual(compat[key], data[key])
+            if 'x' in data:
+                self.assertIs(compat['x'], compat[compat['scanAxis'].split('-')[0]])
+            if measurement.is_constant('time'):
+                compat['time'][0] = -1
+                self.assertNotEqual(measurement['time'][0], -1)
+
+    def test_pickle(self):
+        measurement = pickle.loads(pickle.dumps(read_measurement('tests/test_scan.xrdml')))
+        self.assertTrue(measurement.is_constant('time'))
+        self.assertEqual(measurement['time'].shape, (750,))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+from __future__ import unicode_literals, print_function, division, absolute_import
+import logging
+
+import unittest
+
+import numpy as np
+
+from xrdtools import read_xrdml, read_measurement
+from xrdtools.profiling import Profiler, active
+
+
+class TestProfiler(unittest.TestCase):
+    def test_stages(self):
+        with Profiler() as profiler:
+            self.assertIs(active(), profiler)
+            data = read_xrdml('tests/test_area.xrdml')
+        self.assertIsNone(active())
+
+        summary = profiler.summary()
+        for stage in ['parse', 'validate', 'decode', 'stack', 'metadata']:
+            self.assertIn(stage, summary)
+        nb_scans = len(data['scannb'])
+        self.assertEqual(summary['decode']['count'], nb_scans)
+        self.assertEqual(summary['stack']['count'], nb_scans)
+        self.assertEqual([r['scan'] for r in profiler.records if r['stage'] == 'decode'], list(range(nb_scans)))
+        self.assertGreater(summary['decode']['bytes'], 0)
+        self.assertIsNotNone(summary['decode']['allocated'])
+
+    def test_stream(self):
+        with Profiler(allocations=False) as profiler:
+            data = read_xrdml('tests/test_area.xrdml', stream=True)
+        summary = profiler.summary()
+        # one record per scan and one for the rest of the file
+        self.assertEqual(summary['parse']['count'], len(data['scannb']) + 1)
+        self.assertIsNone(summary['decode']['allocated'])
+
+    def test_same_data(self):
+        data = read_xrdml('tests/test_area.xrdml')
+        with Profiler():
+            profiled = read_xrdml('tests/test_area.xrdml')
+        for key in ['data', '2Theta', 'Omega', 'time']:
+            self.assertTrue(np.array_equal(data[key], profiled[key]))
+
+    def test_nested_stages(self):
+        with Profiler(allocations=False) as profiler:
+            with profiler.stage('outer'):
+                with profiler.stage('inner') as record:
+                    profiler.add_bytes(10)
+        inner, outer = profiler.records
+        self.assertEqual(inner['stage'], 'inner')
+        self.assertEqual(inner['bytes'], 10)
+        self.assertEqual(outer['bytes'], 0)
+        self.assertIs(inner, record)
+
+    def test_callback(self):
+        records = []
+        read_measurement('tests/test_scan.xrdml', profile=records.append)
+        self.assertIn('decode', [record['stage'] for record in records])
+        self.assertIsNone(active())
+
+    def test_logging(self):
+        class Handler(logging.Handler):
+            def __init__(self):
+                logging.Handler.__init__(self)
+                self.records = []
+
+            def emit(self, record):
+                self.records.append(record)
+
+        logger = logging.getLogger('xrdtools.io')
+        handler = Handler()
+        level = logger.level
+        logger.addHandler(handler)
+        logger.setLevel(logging.DEBUG)
+        try:
+            read_xrdml('tests/test_scan.xrdml', profile=True)
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(level)
+        profiles = [record.profile for record in handler.records if hasattr(record, 'profile')]
+        self.assertIn('decode', [profile.get('stage') for profile in profiles])
+        # the summary is the last record
+        self.assertIn('decode', profiles[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
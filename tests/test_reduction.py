@@ -0,0 +1,98 @@
+from __future__ import unicode_literals, print_function, division, absolute_import
+import io
+import os
+import re
+import shutil
+import tempfile
+
+import unittest
+
+import numpy as np
+
+from xrdtools import read_xrdml, read_measurement
+from xrdtools.reduction import reduce_scans, sigma_clip_mask
+
+
+class TestReduceScans(unittest.TestCase):
+    def setUp(self):
+        self.scans = np.random.RandomState(0).poisson(100, size=(50, 20)) / 2.
+
+    def test_mean(self):
+        expected = self.scans[0].copy()
+        for k in range(1, len(self.scans)):
+            expected += self.scans[k]
+        expected /= len(self.scans)
+
+        reduced, variance = reduce_scans(self.scans)
+        self.assertTrue((reduced == expected).all())
+        self.assertIsNone(variance)
+
+        reduced, variance = reduce_scans(self.scans, time=2.)
+        np.testing.assert_allclose(variance, expected / 2. / len(self.scans))
+
+    def test_methods(self):
+        time = np.full(self.scans.shape, 2.)
+        reduced, variance = reduce_scans(self.scans, 'sum', time=time)
+        np.testing.assert_allclose(reduced, self.scans.sum(axis=0))
+        np.testing.assert_allclose(variance, self.scans.sum(axis=0) / 2.)
+
+        reduced, _ = reduce_scans(self.scans, 'median')
+        np.testing.assert_allclose(reduced, np.median(self.scans, axis=0))
+
+        self.assertRaises(ValueError, reduce_scans, self.scans, 'max')
+
+    def test_sigma_clip(self):
+        scans = self.scans.copy()
+        scans[3, 5] = 1e6
+        keep = sigma_clip_mask(scans)
+        self.assertFalse(keep[3, 5])
+        self.assertTrue(keep[:, 6].all())
+
+        reduced, variance = reduce_scans(scans, 'sigma-clip', time=2.)
+        self.assertAlmostEqual(reduced[5], np.delete(scans[:, 5], 3).mean())
+        self.assertAlmostEqual(variance[5], np.delete(scans[:, 5], 3).sum() / 2. / 49 ** 2)
+
+    def test_single_scan(self):
+        reduced, _ = reduce_scans(self.scans[0])
+        self.assertTrue((reduced == self.scans[0]).all())
+
+
+class TestRepeatedScan(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp, 'repeated.xrdml')
+        with io.open('tests/test_scan.xrdml', encoding='utf8') as f:
+            text = f.read()
+        start, end = text.index('<scan '), text.index('</scan>') + len('</scan>')
+        text = text[:start] + '\n'.join([text[start:end]] * 3) + text[end:]
+        text = re.sub('measurementType="[^"]*"', 'measurementType="Repeated scan"', text, count=1)
+        with io.open(self.filename, 'w', encoding='utf8') as f:
+            f.write(text)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_read_xrdml_reduce(self):
+        scan = read_xrdml('tests/test_scan.xrdml')
+        for method in ['mean', 'median', 'sigma-clip']:
+            data = read_xrdml(self.filename, reduce=method, variance=True)
+            self.assertEqual(data['measType'], 'Repeated scan')
+            np.testing.assert_allclose(data['data'], scan['data'])
+            self.assertEqual(data['variance'].shape, scan['data'].shape)
+        data = read_xrdml(self.filename, reduce='sum')
+        np.testing.assert_allclose(data['data'], 3 * scan['data'])
+        self.assertNotIn('variance', data)
+
+    def test_unknown_reduction(self):
+        # also for files which are not repeated scans
+        for filename in [self.filename, 'tests/test_area.xrdml']:
+            with self.assertRaises(ValueError):
+                read_xrdml(filename, reduce='bogus')
+            with self.assertRaises(ValueError):
+                read_xrdml(filename, reduce='bogus', memory_cache=True)
+            with self.assertRaises(ValueError):
+                read_measurement(filename, reduce='bogus')
+
+
+if __name__ == '__main__':
+    unittest.main()
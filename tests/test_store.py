@@ -0,0 +1,67 @@
+from __future__ import unicode_literals, print_function, division, absolute_import
+import os
+import shutil
+import tempfile
+
+import unittest
+
+import numpy as np
+
+import xrdtools
+from xrdtools import read_xrdml
+
+
+class TestStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'store')
+        self.files = os.path.join(self.tmp, 'files')
+        os.makedirs(self.files)
+        for name in ['test_scan.xrdml', 'test_area.xrdml']:
+            shutil.copy(os.path.join('tests', name), self.files)
+        self.scan = os.path.join(self.files, 'test_scan.xrdml')
+        self.area = os.path.join(self.files, 'test_area.xrdml')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_ingest(self):
+        store = xrdtools.store.open(self.path)
+        self.assertEqual(len(store), 0)
+        added, errors = store.ingest(self.files)
+        self.assertEqual(sorted(added), sorted([self.scan, self.area]))
+        self.assertEqual(errors, {})
+
+        # only new or changed files are loaded again
+        store = xrdtools.store.open(self.path)
+        self.assertEqual(store.keys(), sorted([self.scan, self.area]))
+        self.assertEqual(store.ingest(self.files), ([], {}))
+        os.utime(self.scan, (0, 0))
+        self.assertEqual(store.ingest([self.scan, self.area]), ([self.scan], {}))
+        self.assertEqual(len(os.listdir(self.path)), 3)
+
+        data = read_xrdml(self.area)
+        stored = store[self.area]
+        self.assertIsInstance(stored['data'], np.memmap)
+        self.assertTrue((stored['data'] == data['data']).all())
+        self.assertEqual(stored['hkl'], data['hkl'])
+
+    def test_metadata(self):
+        store = xrdtools.store.open(self.path)
+        store.ingest([self.scan, self.area, os.path.join(self.files, 'missing.xrdml')])
+
+        metadata = store.metadata(self.area)
+        self.assertEqual(metadata['sample'], 'B11091')
+        self.assertEqual(metadata['substrate'], 'SrTiO3')
+        self.assertEqual(metadata['hkl'], [0, 1, 3])
+        self.assertEqual(store.find(measType='Scan'), [self.scan])
+        self.assertEqual(store.find(substrate='SrTiO3', measType='Area measurement'), [self.area])
+        self.assertEqual(sorted(row['name'] for row in store.table()), sorted([self.scan, self.area]))
+
+        store.remove(self.scan)
+        self.assertNotIn(self.scan, xrdtools.store.open(self.path))
+        self.assertEqual(len(os.listdir(self.path)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+from __future__ import unicode_literals, print_function, division, absolute_import
+import os
+import re
+import shutil
+import tempfile
+
+import unittest
+
+import numpy as np
+
+from xrdtools import read_xrdml
+from xrdtools.tail import TailReader
+
+
+class TestTailReader(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'live.xrdml')
+        with open('tests/test_area.xrdml', 'rb') as f:
+            self.content = f.read()
+        self.data = read_xrdml('tests/test_area.xrdml')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, content):
+        with open(self.filename, 'wb') as f:
+            f.write(content)
+
+    def test_growing_file(self):
+        reader = TailReader(self.filename)
+        # the file does not exist yet
+        self.assertEqual(reader.poll()['scannb'], [])
+
+        scannb = []
+        rows = []
+        for size in list(range(0, len(self.content), 20000)) + [len(self.content)]:
+            self.write(self.content[:size])
+            scans = reader.poll()
+            scannb += scans['scannb']
+            if scans['scannb']:
+                self.assertEqual(scans['data'].ndim, 2)
+                rows.append(scans['data'])
+        self.assertTrue(reader.finished)
+        self.assertEqual(scannb, list(range(len(self.data['scannb']))))
+        self.assertEqual(reader.nb_scans, len(scannb))
+        self.assertTrue(np.array_equal(np.vstack(rows), self.data['data']))
+        self.assertEqual(reader.header['measType'], 'Area measurement')
+
+    def test_rewritten_file(self):
+        started = self.content.replace(b'status="Completed">', b'status="Started">', 1)
+        half = started.index(b'</scan>', len(started) // 2) + len(b'</scan>')
+        self.write(started[:half])
+        reader = TailReader(self.filename)
+        first = reader.poll()['scannb']
+
+        # the status of the measurement changes, which moves all scans
+        self.write(self.content)
+        rest = reader.poll()
+        self.assertEqual(first + rest['scannb'], list(range(len(self.data['scannb']))))
+        self.assertTrue(np.array_equal(rest['data'], self.data['data'][len(first):]))
+
+    def test_rewritten_file_without_new_scans(self):
+        started = self.content.replace(b'status="Completed">', b'status="Started">', 1)
+        half = started.index(b'</scan>', len(started) // 2) + len(b'</scan>')
+        self.write(started[:half])
+        reader = TailReader(self.filename)
+        first = reader.poll()['scannb']
+
+        # the status changes, but no scan is added
+        rewritten = self.content[:self.content.index(b'</scan>', len(self.content) // 2) + len(b'</scan>')]
+        self.write(rewritten)
+        self.assertEqual(reader.poll()['scannb'], [])
+        self.assertEqual(reader.poll()['scannb'], [])
+        self.assertEqual(reader.nb_scans, len(first))
+
+        self.write(self.content)
+        rest = reader.poll()
+        self.assertEqual(first + rest['scannb'], list(range(len(self.data['scannb']))))
+        self.assertTrue(np.array_equal(rest['data'], self.data['data'][len(first):]))
+
+    def test_partially_rewritten_file(self):
+        started = self.content.replace(b'status="Completed">', b'status="Started">', 1)
+        half = started.index(b'</scan>', len(started) // 2) + len(b'</scan>')
+        self.write(started[:half])
+        reader = TailReader(self.filename)
+        first = reader.poll()['scannb']
+
+        # the rewritten file holds fewer scans than were returned so far
+        quarter = self.content.index(b'</scan>', len(self.content) // 4) + len(b'</scan>')
+        self.write(self.content[:quarter])
+        self.assertEqual(reader.poll()['scannb'], [])
+        self.assertEqual(reader.nb_scans, len(first))
+
+        self.write(self.content)
+        rest = reader.poll()
+        self.assertEqual(first + rest['scannb'], list(range(len(self.data['scannb']))))
+        self.assertTrue(np.array_equal(rest['data'], self.data['data'][len(first):]))
+        self.assertEqual(reader.nb_scans, len(self.data['scannb']))
+
+    def test_incomplete_scan(self):
+        end = self.content.index(b'</scan>', len(self.content) // 2) + len(b'</scan>')
+        start = self.content.rindex(b'<scan ', 0, end)
+        # the last scan written so far is still in progress
+        scan = self.content[start:end].replace(b'status="Completed"', b'status="Incomplete"')
+        incomplete = self.content[:start] + scan
+        self.write(incomplete)
+        reader = TailReader(self.filename)
+        scans = reader.poll()
+        nb_completed = len(scans['scannb'])
+        self.assertEqual(scans['iscannb'], [nb_completed])
+        self.assertEqual(len(scans['idata']), 1)
+        self.assertEqual(reader.nb_scans, nb_completed)
+
+        self.write(self.content)
+        scans = reader.poll()
+        self.assertEqual(scans['scannb'][0], nb_completed)
+        self.assertEqual(scans['iscannb'], [])
+
+    def test_rewritten_header(self):
+        started = self.content.replace(b'status="Completed">', b'status="Started">', 1)
+        half = started.index(b'</scan>', len(started) // 2) + len(b'</scan>')
+        self.write(started[:half])
+        reader = TailReader(self.filename)
+        reader.poll()
+        self.assertEqual(reader.header['status'], 'Started')
+
+        self.write(self.content)
+        reader.poll()
+        self.assertEqual(reader.header['status'], 'Completed')
+
+    def test_namespace_prefix(self):
+        # the xrdml namespace bound to a prefix instead of the default namespace
+        content = re.sub(br'<(/?)(?=[A-Za-z])', br'<\1xrd:', self.content)
+        content = content.replace(b'xmlns="', b'xmlns:xrd="', 1)
+        self.write(content)
+        reader = TailReader(self.filename)
+        scans = reader.poll()
+        self.assertTrue(reader.finished)
+        self.assertEqual(scans['scannb'], list(range(len(self.data['scannb']))))
+        self.assertTrue(np.array_equal(scans['data'], self.data['data']))
+
+    def test_validate(self):
+        with self.assertRaises(ValueError):
+            TailReader(self.filename, validate='full')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import unittest
+
+import numpy as np
+
+from xrdtools import read_xrdml
+from xrdtools.utils import angle2qvector, get_qmap, q2hkl_map, angles, hkl2angles
+
+
+class TestAngle2QVector(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.tt = rng.uniform(10, 120, (30, 20))
+        self.om = rng.uniform(0, 60, (30, 1))
+
+    def reference(self, tt, om, lam=1.54):
+        t_rad = np.radians(tt) / 2.
+        delta = t_rad - np.radians(om)
+        delta_k = 2. / lam * np.sin(t_rad)
+        return delta_k * np.sin(delta), delta_k * np.cos(delta)
+
+    def test_values(self):
+        kpar, kperp = angle2qvector(self.tt, self.om, 1.5406)
+        expected = self.reference(self.tt, self.om, 1.5406)
+        self.assertEqual(kpar.shape, (30, 20))
+        self.assertTrue((kpar == expected[0]).all())
+        self.assertTrue((kperp == expected[1]).all())
+
+        kpar, kperp = angle2qvector(50., 20.)
+        self.assertIsInstance(kpar, np.float64)
+        self.assertAlmostEqual(kperp, self.reference(50., 20.)[1])
+
+    def test_out(self):
+        out = (np.empty((30, 20)), np.empty((30, 20)))
+        work = np.empty((30, 20))
+        result = angle2qvector(self.tt, self.om, omega_offset=0.5, out=out, work=work)
+        self.assertIs(result[0], out[0])
+        self.assertIs(result[1], out[1])
+        expected = self.reference(self.tt, self.om + 0.5)
+        self.assertTrue((out[0] == expected[0]).all())
+        self.assertTrue((out[1] == expected[1]).all())
+
+    def test_float32(self):
+        kpar, kperp = angle2qvector(self.tt, self.om, dtype=np.float32)
+        self.assertEqual(kpar.dtype, np.float32)
+        self.assertEqual(kperp.dtype, np.float32)
+        expected = self.reference(self.tt, self.om)
+        np.testing.assert_allclose(kpar, expected[0], atol=1e-5)
+        np.testing.assert_allclose(kperp, expected[1], atol=1e-5)
+
+    def test_get_qmap(self):
+        data = read_xrdml('tests/test_area.xrdml')
+        kpar, kperp = get_qmap(data, omega_offset=0.1)
+        expected = self.reference(data['2Theta'], data['Omega'] + 0.1, data['Lambda'])
+        self.assertTrue((kpar == expected[0]).all())
+        self.assertTrue((kperp == expected[1]).all())
+
+    def test_array_offset(self):
+        data = read_xrdml('tests/test_area.xrdml')
+        offset = np.linspace(-0.1, 0.1, len(data['Omega']))[:, np.newaxis]
+        kpar, kperp = get_qmap(data, omega_offset=offset)
+        expected = self.reference(data['2Theta'], data['Omega'] + offset, data['Lambda'])
+        self.assertTrue((kpar == expected[0]).all())
+        self.assertTrue((kperp == expected[1]).all())
+
+
+class TestHkl(unittest.TestCase):
+    def test_q2hkl_map(self):
+        x = np.array([0.1, 0.2])
+        y = np.array([0.5, 0.6])
+        h, l_ = q2hkl_map(x, y, lattice_params=(4., 4., 3.9), hkl={'h': 1, 'k': 0, 'l': 3})
+        np.testing.assert_allclose(h, x * 4.)
+        np.testing.assert_allclose(l_, y * 3.9)
+        # the inputs are not modified
+        self.assertEqual(list(x), [0.1, 0.2])
+        self.assertEqual(list(y), [0.5, 0.6])
+        np.testing.assert_allclose(q2hkl_map(x, y, hkl=(1, 0, 3))[0], x * 3.905)
+
+    def test_hkl2angles(self):
+        hkl = np.array([[0, 0, 1], [1, 0, 3], [1, 1, 3], [2, 0, 4]])
+        lattice_params = np.array([[3.905, 3.905, 3.905], [3.9, 3.95, 4.1]])
+
+        tt, omega, delta = hkl2angles(hkl[1], 1.5406)
+        self.assertEqual(np.shape(tt), ())
+
+        tt, omega, delta = hkl2angles(hkl, 1.5406)
+        self.assertEqual(tt.shape, (4,))
+
+        tt, omega, delta = hkl2angles(hkl, 1.5406, lattice_params)
+        self.assertEqual(tt.shape, (2, 4))
+        for m, params in enumerate(lattice_params):
+            for n, (h, k, l_) in enumerate(hkl):
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    expected = angles({'h': h, 'k': k, 'l': l_}, 1.5406, params)
+                self.assertAlmostEqual(tt[m, n], expected[0])
+                self.assertAlmostEqual(omega[m, n], expected[1])
+                self.assertAlmostEqual(delta[m, n], expected[2])
+
+        self.assertRaises(ValueError, hkl2angles, [[1, 0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
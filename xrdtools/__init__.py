@@ -1,5 +1,10 @@
-from xrdtools.io import read_xrdml  # noqa: F401
+from xrdtools.io import read_xrdml, read_measurement, read_xrdml_header  # noqa: F401
+from xrdtools.measurement import Measurement  # noqa: F401
+from xrdtools.batch import read_many, iter_many, scan_catalog  # noqa: F401
+from xrdtools.tail import TailReader  # noqa: F401
 from xrdtools import utils  # noqa: F401
+from xrdtools import store  # noqa: F401
+from xrdtools import profiling  # noqa: F401
 from xrdtools import tools  # noqa: F401
 
 
@@ -0,0 +1,298 @@
+"""
+Asyncio entry points for loading xrdml files.
+
+The files are read and parsed in a bounded executor, so the event loop is
+not blocked while a large measurement is loaded. The results are the same
+as the ones of the synchronous functions. This module requires python 3.5
+or newer and is not imported by `import xrdtools`, use
+`import xrdtools.aio`.
+
+Examples
+--------
+>>> data = await xrdtools.aio.read_xrdml('foo.xrdml')
+>>> async for filename, data, error in xrdtools.aio.iter_many(filenames):
+...     update_dashboard(filename, data)
+"""
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import os
+import asyncio
+import logging
+import functools
+from collections import deque
+
+from xrdtools.io import read_xrdml as _read_xrdml, read_measurement as _read_measurement
+from xrdtools.io import read_xrdml_header as _read_xrdml_header
+from xrdtools.batch import EXECUTORS
+
+logger = logging.getLogger(__name__)
+
+
+class Loader(object):
+    """
+    Bounded executor for loading xrdml files from asyncio.
+
+    At most `limit` files are submitted to the executor at the same time,
+    the other loads wait without occupying the executor. If a waiting
+    load is cancelled, the file is never read. A load which already runs
+    in the executor can not be interrupted, it finishes in the background
+    and its result is discarded.
+
+    Parameters
+    ----------
+    workers : int or None, optional
+        The number of workers of the executor. If None, the default of the
+        executor is used [Default: None].
+    executor : {'thread', 'process'}, optional
+        Load the files in a pool of threads or processes. Processes parse
+        large files in parallel, but the results have to be copied between
+        the processes [Default: 'thread'].
+    limit : int or None, optional
+        The maximal number of loads submitted at the same time, defaults to
+        `workers` or the number of CPUs [Default: None].
+
+    Examples
+    --------
+    >>> async with xrdtools.aio.Loader(workers=2) as loader:
+    ...     data = await loader.read_xrdml('foo.xrdml', stream=True)
+    """
+
+    def __init__(self, workers=None, executor='thread', limit=None):
+        if executor not in EXECUTORS:
+            raise ValueError('Unknown executor "{}", use one of {}.'.format(executor, sorted(EXECUTORS)))
+        self.limit = limit or workers or os.cpu_count() or 1
+        self._executor = EXECUTORS[executor](max_workers=workers)
+        self._semaphore = None
+        self._loop = None
+
+    def _get_semaphore(self):
+        """Get the semaphore limiting the loads for the current event loop."""
+        loop = asyncio.get_event_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.limit)
+            self._loop = loop
+        return self._semaphore
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run a blocking function in the executor.
+
+        Parameters
+        ----------
+        func : callable
+            The function, it has to be picklable for a process executor.
+        *args, **kwargs
+            The arguments of `func`.
+
+        Returns
+        -------
+        object
+            The return value of `func`.
+        """
+        async with self._get_semaphore():
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def read_xrdml(self, filename, **kwargs):
+        """Load a xrdml file, see `xrdtools.read_xrdml`."""
+        return await self.run(_read_xrdml, filename, **kwargs)
+
+    async def read_measurement(self, filename, **kwargs):
+        """Load a xrdml file as `Measurement`, see `xrdtools.read_measurement`."""
+        return await self.run(_read_measurement, filename, **kwargs)
+
+    async def read_xrdml_header(self, filename):
+        """Read the settings of a xrdml file, see `xrdtools.read_xrdml_header`."""
+        return await self.run(_read_xrdml_header, filename)
+
+    def iter_many(self, filenames, **kwargs):
+        """
+        Load many xrdml files and iterate over them as they finish.
+
+        Parameters
+        ----------
+        filenames : iterable of str
+            The filenames of the xrdml files to load.
+        **kwargs
+            Keyword arguments passed to `xrdtools.read_xrdml`.
+
+        Returns
+        -------
+        async iterator
+            An asynchronous iterator over `(filename, data, error)` tuples
+            as yielded by `xrdtools.iter_many`. Stopping the iteration early
+            with `aclose` cancels the pending loads.
+        """
+        return _IterMany(self, filenames, kwargs)
+
+    def close(self, wait=True):
+        """
+        Shut down the executor.
+
+        Parameters
+        ----------
+        wait : bool, optional
+            Wait for the running loads to finish [Default: True].
+        """
+        self._executor.shutdown(wait=wait)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        # do not block the event loop while the executor shuts down
+        await asyncio.get_event_loop().run_in_executor(None, self.close)
+        return False
+
+
+class _IterMany(object):
+    """Asynchronous iterator of `Loader.iter_many`, without async generators for python 3.5."""
+
+    def __init__(self, loader, filenames, kwargs):
+        self._loader = loader
+        self._filenames = iter(filenames)
+        self._kwargs = kwargs
+        self._pending = set()
+        self._done = deque()
+
+    async def _load(self, filename):
+        try:
+            data = await self._loader.read_xrdml(filename, **self._kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning('Failed to load "{}": {}'.format(filename, e))
+            return filename, None, e
+        return filename, data, None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._done:
+            return self._done.popleft()
+        # keep the loader busy, but do not create a task for every file at once
+        while len(self._pending) < self._loader.limit:
+            filename = next(self._filenames, None)
+            if filename is None:
+                break
+            self._pending.add(asyncio.ensure_future(self._load(filename)))
+        if not self._pending:
+            raise StopAsyncIteration
+        try:
+            done, self._pending = await asyncio.wait(self._pending, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            await self.aclose()
+            raise
+        self._done.extend(task.result() for task in done)
+        return self._done.popleft()
+
+    async def aclose(self):
+        """Cancel the pending loads."""
+        self._filenames = iter(())
+        for task in self._pending:
+            task.cancel()
+        if self._pending:
+            await asyncio.wait(self._pending)
+        self._pending = set()
+
+
+_default_loader = None
+
+
+def get_loader():
+    """
+    Get the default loader of the module functions.
+
+    Returns
+    -------
+    Loader
+        A loader with a thread pool of the default size.
+    """
+    global _default_loader
+    if _default_loader is None:
+        _default_loader = Loader()
+    return _default_loader
+
+
+async def read_xrdml(filename, loader=None, **kwargs):
+    """
+    Load a xrdml file without blocking the event loop.
+
+    Parameters
+    ----------
+    filename : str
+        The filename of the xrdml file to be loaded.
+    loader : Loader or None, optional
+        The loader, defaults to the loader of `get_loader` [Default: None].
+    **kwargs
+        Keyword arguments passed to `xrdtools.read_xrdml`.
+
+    Returns
+    -------
+    dict
+        The same dictionary as returned by `xrdtools.read_xrdml`.
+    """
+    return await (loader or get_loader()).read_xrdml(filename, **kwargs)
+
+
+async def read_measurement(filename, loader=None, **kwargs):
+    """
+    Load a xrdml file as `Measurement` without blocking the event loop.
+
+    Parameters
+    ----------
+    filename : str
+        The filename of the xrdml file to be loaded.
+    loader : Loader or None, optional
+        The loader, defaults to the loader of `get_loader` [Default: None].
+    **kwargs
+        Keyword arguments passed to `xrdtools.read_measurement`.
+
+    Returns
+    -------
+    Measurement
+        The same measurement as returned by `xrdtools.read_measurement`.
+    """
+    return await (loader or get_loader()).read_measurement(filename, **kwargs)
+
+
+async def read_xrdml_header(filename, loader=None):
+    """
+    Read the settings of a xrdml file without blocking the event loop.
+
+    Parameters
+    ----------
+    filename : str
+        The filename of the xrdml file.
+    loader : Loader or None, optional
+        The loader, defaults to the loader of `get_loader` [Default: None].
+
+    Returns
+    -------
+    dict
+        The same dictionary as returned by `xrdtools.read_xrdml_header`.
+    """
+    return await (loader or get_loader()).read_xrdml_header(filename)
+
+
+def iter_many(filenames, loader=None, **kwargs):
+    """
+    Load many xrdml files and iterate asynchronously over them as they finish.
+
+    Parameters
+    ----------
+    filenames : iterable of str
+        The filenames of the xrdml files to load.
+    loader : Loader or None, optional
+        The loader, defaults to the loader of `get_loader` [Default: None].
+    **kwargs
+        Keyword arguments passed to `xrdtools.read_xrdml`.
+
+    Returns
+    -------
+    async iterator
+        An asynchronous iterator over `(filename, data, error)` tuples, see
+        `Loader.iter_many`.
+    """
+    return (loader or get_loader()).iter_many(filenames, **kwargs)
@@ -0,0 +1,262 @@
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import os
+import sys
+import logging
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent import futures
+
+from xrdtools.io import read_xrdml, read_xrdml_header
+
+logger = logging.getLogger(__name__)
+
+# the extensions of the files found by `find_files`, compressed files are read directly
+XRDML_EXTENSIONS = ('.xrdml', '.xrdml.gz', '.xrdml.bz2', '.xrdml.xz')
+
+EXECUTORS = {'process': futures.ProcessPoolExecutor,
+             'thread': futures.ThreadPoolExecutor}
+
+
+def _default_workers(executor):
+    """Get the default number of workers of an executor type."""
+    cpus = multiprocessing.cpu_count()
+    if executor == 'process':
+        return cpus
+    if sys.version_info >= (3, 8):
+        return min(32, cpus + 4)
+    return cpus * 5
+
+
+def _imap(func, items, workers=None, executor='process', ordered=False):
+    """
+    Apply `func` to all `items` in a pool of workers.
+
+    At most twice as many items as workers are submitted to the pool at
+    the same time, the next item is submitted once a result is yielded.
+    So only a bounded number of finished results wait to be consumed.
+
+    Parameters
+    ----------
+    func : callable
+        A picklable function taking one item as argument.
+    items : list
+        The items to process.
+    workers : int or None, optional
+        The number of workers. If 1, the items are processed one after the
+        other in the current process. If None, the default of the executor
+        is used [Default: None].
+    executor : {'process', 'thread'}, optional
+        The type of pool to use [Default: 'process'].
+    ordered : bool, optional
+        If True, the results are yielded in the order of `items`, otherwise
+        as soon as they are finished [Default: False].
+
+    Yields
+    ------
+    index : int
+        The index of the item in `items`.
+    result : object or None
+        The return value of `func` or None if it raised an exception.
+    error : Exception or None
+        The exception raised by `func` or None.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError('Unknown executor "{}", use one of {}.'.format(executor, sorted(EXECUTORS)))
+
+    if workers == 1 or len(items) <= 1:
+        for k, item in enumerate(items):
+            try:
+                result = func(item)
+            except Exception as e:
+                yield k, None, e
+            else:
+                yield k, result, None
+        return
+
+    if workers is None:
+        workers = _default_workers(executor)
+    pool = EXECUTORS[executor](max_workers=workers)
+    window = 2 * workers
+    remaining = enumerate(items)
+    jobs = {}
+    # the submitted jobs in the order of the items
+    order = deque()
+    try:
+        while True:
+            for k, item in itertools.islice(remaining, window - len(jobs)):
+                job = pool.submit(func, item)
+                jobs[job] = k
+                order.append(job)
+            if not jobs:
+                break
+            if ordered:
+                done = [order.popleft()]
+            else:
+                done, _ = futures.wait(jobs, return_when=futures.FIRST_COMPLETED)
+                done = sorted(done, key=jobs.get)
+                for job in done:
+                    order.remove(job)
+            for job in done:
+                k = jobs.pop(job)
+                try:
+                    result = job.result()
+                except Exception as e:
+                    yield k, None, e
+                else:
+                    yield k, result, None
+    finally:
+        # stop the pending jobs if the caller stops early
+        for job in jobs:
+            job.cancel()
+        pool.shutdown(wait=True)
+
+
+class _ReadXrdml(object):
+    """Picklable wrapper of `read_xrdml` with fixed keyword arguments."""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+    def __call__(self, filename):
+        return read_xrdml(filename, **self.kwargs)
+
+
+def iter_many(filenames, workers=None, executor='process', **kwargs):
+    """
+    Load many xrdml files in parallel and yield them as they finish.
+
+    Parameters
+    ----------
+    filenames : iterable of str
+        The filenames of the xrdml files to load.
+    workers : int or None, optional
+        The number of workers. If 1, the files are loaded one after the other
+        in the current process. If None, the default of the executor is used
+        [Default: None].
+    executor : {'process', 'thread'}, optional
+        Load the files in a pool of processes or threads [Default: 'process'].
+    **kwargs
+        Keyword arguments passed to `read_xrdml`.
+
+    Yields
+    ------
+    filename : str
+        The filename of the loaded file.
+    data : dict or None
+        The data dictionary as returned by `read_xrdml` or None if loading
+        the file failed.
+    error : Exception or None
+        The exception raised while loading the file or None.
+    """
+    filenames = list(filenames)
+    for k, data, error in _imap(_ReadXrdml(**kwargs), filenames, workers=workers, executor=executor):
+        if error is not None:
+            logger.warning('Failed to load "{}": {}'.format(filenames[k], error))
+        yield filenames[k], data, error
+
+
+def read_many(filenames, workers=None, executor='process', **kwargs):
+    """
+    Load many xrdml files in parallel.
+
+    A file which can not be loaded does not abort the loading of the other
+    files, its error is collected instead.
+
+    Parameters
+    ----------
+    filenames : iterable of str
+        The filenames of the xrdml files to load.
+    workers : int or None, optional
+        The number of workers. If 1, the files are loaded one after the other
+        in the current process. If None, the default of the executor is used
+        [Default: None].
+    executor : {'process', 'thread'}, optional
+        Load the files in a pool of processes or threads [Default: 'process'].
+    **kwargs
+        Keyword arguments passed to `read_xrdml`.
+
+    Returns
+    -------
+    data : list
+        The data dictionaries in the order of `filenames`, None for the
+        files which could not be loaded.
+    errors : dict
+        The exceptions raised while loading, with the filenames as keys.
+    """
+    filenames = list(filenames)
+    data = [None] * len(filenames)
+    errors = {}
+    for k, result, error in _imap(_ReadXrdml(**kwargs), filenames, workers=workers, executor=executor):
+        if error is not None:
+            logger.warning('Failed to load "{}": {}'.format(filenames[k], error))
+            errors[filenames[k]] = error
+        data[k] = result
+    return data, errors
+
+
+def find_files(paths):
+    """
+    Find xrdml files.
+
+    Parameters
+    ----------
+    paths : str or list of str
+        Filenames or directories, which are searched recursively for files
+        with the extensions `XRDML_EXTENSIONS`, e.g. `.xrdml` or `.xrdml.gz`.
+
+    Returns
+    -------
+    list of str
+        The absolute filenames.
+    """
+    if not isinstance(paths, (list, tuple)):
+        paths = [paths]
+    filenames = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, names in os.walk(path):
+                dirnames.sort()
+                filenames.extend(os.path.join(dirpath, name) for name in sorted(names)
+                                 if name.lower().endswith(XRDML_EXTENSIONS))
+        else:
+            filenames.append(path)
+    return [os.path.abspath(filename) for filename in filenames]
+
+
+def scan_catalog(root, workers=None, executor='process'):
+    """
+    Read the headers of all xrdml files in a directory.
+
+    Only the settings of the files are read with `read_xrdml_header`, the
+    data is not decoded.
+
+    Parameters
+    ----------
+    root : str or list of str
+        The directory searched recursively for xrdml files, or a list of
+        directories and filenames.
+    workers : int or None, optional
+        The number of workers. If 1, the files are read one after the other
+        in the current process. If None, the default of the executor is used
+        [Default: None].
+    executor : {'process', 'thread'}, optional
+        Read the files in a pool of processes or threads [Default: 'process'].
+
+    Returns
+    -------
+    rows : list of dict
+        The headers of the files in the order of the filenames.
+    errors : dict
+        The exceptions raised while reading, with the filenames as keys.
+    """
+    filenames = find_files(root)
+    rows = [None] * len(filenames)
+    errors = {}
+    for k, header, error in _imap(read_xrdml_header, filenames, workers=workers, executor=executor):
+        if error is not None:
+            logger.warning('Failed to read the header of "{}": {}'.format(filenames[k], error))
+            errors[filenames[k]] = error
+        rows[k] = header
+    return [row for row in rows if row is not None], errors
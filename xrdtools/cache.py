@@ -0,0 +1,431 @@
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import os
+import io
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# bump to invalidate the entries written by older versions
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.environ.get('XRDTOOLS_CACHE_DIR',
+                                   os.path.join(os.path.expanduser('~'), '.cache', 'xrdtools'))
+
+DEFAULT_CACHE_SIZE = 2 ** 30  # 1 GiB
+
+DEFAULT_MEMORY_CACHE_SIZE = 2 ** 28  # 256 MiB
+
+_INDEX = 'index.json'
+
+
+def get_key(filename, method='stat', options=''):
+    """
+    Get the cache key of a file.
+
+    Parameters
+    ----------
+    filename : str
+        The filename of the xrdml file.
+    method : {'stat', 'content'}, optional
+        'stat' derives the key from the absolute path, modification time and
+        size of the file, 'content' from a hash of the file content, which
+        also finds copies or moved files [Default: 'stat'].
+    options : str, optional
+        A description of the read options, entries read with other options
+        get other keys [Default: ''].
+
+    Returns
+    -------
+    str
+        The cache key.
+    """
+    h = hashlib.sha1('xrdtools-cache-{}|{}|'.format(CACHE_VERSION, options).encode('utf8'))
+    if method == 'stat':
+        stat = os.stat(filename)
+        h.update('{}|{}|{}'.format(os.path.abspath(filename), stat.st_mtime, stat.st_size).encode('utf8'))
+    elif method == 'content':
+        with open(filename, 'rb') as f:
+            for block in iter(lambda: f.read(2 ** 20), b''):
+                h.update(block)
+    else:
+        raise ValueError('Unknown cache key method "{}", use "stat" or "content".'.format(method))
+    return h.hexdigest()
+
+
+def _encode(value, path, name):
+    """Encode a value of a data dictionary for the index, arrays are saved to `path`."""
+    if isinstance(value, np.ndarray):
+        filename = name + '.npy'
+        np.save(os.path.join(path, filename), value)
+        return {'type': 'array', 'file': filename}
+    elif isinstance(value, np.generic):
+        return {'type': 'scalar', 'dtype': value.dtype.str, 'value': value.item()}
+    elif isinstance(value, list) and any(isinstance(v, np.ndarray) for v in value):
+        return {'type': 'list', 'value': [_encode(v, path, '{}_{}'.format(name, k)) for k, v in enumerate(value)]}
+    return {'type': 'json', 'value': value}
+
+
+def _decode(spec, path, mmap_mode):
+    """Decode a value of the index, arrays are memory-mapped from `path`."""
+    if spec['type'] == 'array':
+        return np.load(os.path.join(path, spec['file']), mmap_mode=mmap_mode)
+    elif spec['type'] == 'scalar':
+        return np.dtype(str(spec['dtype'])).type(spec['value'])
+    elif spec['type'] == 'list':
+        return [_decode(v, path, mmap_mode) for v in spec['value']]
+    return spec['value']
+
+
+def store(cache_dir, key, data):
+    """
+    Store a data dictionary in the cache.
+
+    Every array is saved as a `.npy` file, all other values are saved in a
+    json index. The entry is written to a temporary directory first and
+    moved into place, so that readers never see incomplete entries.
+
+    Parameters
+    ----------
+    cache_dir : str
+        The cache directory.
+    key : str
+        The cache key of the entry.
+    data : dict
+        A xrdml data dictionary.
+    """
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    path = os.path.join(cache_dir, key)
+    if os.path.exists(path):
+        return
+
+    tmp = tempfile.mkdtemp(prefix='.tmp-', dir=cache_dir)
+    try:
+        index = [[key_, _encode(value, tmp, 'a{}'.format(k))] for k, (key_, value) in enumerate(data.items())]
+        with io.open(os.path.join(tmp, _INDEX), 'w', encoding='utf8') as f:
+            f.write(json.dumps(index, ensure_ascii=False))
+        os.rename(tmp, path)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.exists(path):
+            raise
+
+
+def load(cache_dir, key, mmap_mode='c'):
+    """
+    Load a data dictionary from the cache.
+
+    Parameters
+    ----------
+    cache_dir : str
+        The cache directory.
+    key : str
+        The cache key of the entry.
+    mmap_mode : {None, 'r', 'c'}, optional
+        The memory-map mode of the arrays, see `numpy.load`. With 'c' the
+        arrays can be modified without changing the cache [Default: 'c'].
+
+    Returns
+    -------
+    dict or None
+        The data dictionary or None if the entry is not in the cache.
+    """
+    path = os.path.join(cache_dir, key)
+    try:
+        with io.open(os.path.join(path, _INDEX), 'r', encoding='utf8') as f:
+            index = json.loads(f.read())
+        data = dict((key_, _decode(spec, path, mmap_mode)) for key_, spec in index)
+    except (IOError, OSError, ValueError):
+        return None
+    # mark the entry as recently used
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+    return data
+
+
+def _entries(cache_dir):
+    """List the entries of the cache as (path, size, last access) tuples."""
+    entries = []
+    if not os.path.isdir(cache_dir):
+        return entries
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.startswith('.') or not os.path.isdir(path):
+            continue
+        size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        entries.append((path, size, os.path.getmtime(path)))
+    return entries
+
+
+def evict(cache_dir, max_size=DEFAULT_CACHE_SIZE):
+    """
+    Remove the least recently used entries until the cache fits into `max_size`.
+
+    Parameters
+    ----------
+    cache_dir : str
+        The cache directory.
+    max_size : int, optional
+        The maximal size of the cache in bytes [Default: 1 GiB].
+
+    Returns
+    -------
+    int
+        The number of removed entries.
+    """
+    entries = sorted(_entries(cache_dir), key=lambda entry: entry[2])
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for path, size, _ in entries:
+        if total <= max_size:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed += 1
+    if removed:
+        logger.debug('Removed {} entries from the cache "{}".'.format(removed, cache_dir))
+    return removed
+
+
+def clear(cache_dir):
+    """
+    Remove all entries from the cache.
+
+    Parameters
+    ----------
+    cache_dir : str
+        The cache directory.
+
+    Returns
+    -------
+    int
+        The number of removed entries.
+    """
+    return evict(cache_dir, max_size=-1)
+
+
+def stats(cache_dir):
+    """
+    Get statistics of the cache.
+
+    Parameters
+    ----------
+    cache_dir : str
+        The cache directory.
+
+    Returns
+    -------
+    dict
+        The cache directory 'cache_dir', the number of 'entries' and
+        their total 'size' in bytes.
+    """
+    entries = _entries(cache_dir)
+    return {'cache_dir': cache_dir,
+            'entries': len(entries),
+            'size': sum(size for _, size, _ in entries)}
+
+
+def _readonly(value):
+    """Get a read-only view of the arrays in `value` and copies of its containers."""
+    if isinstance(value, np.ndarray):
+        view = value.view()
+        view.flags.writeable = False
+        return view
+    elif isinstance(value, list):
+        return [_readonly(v) for v in value]
+    elif isinstance(value, dict):
+        return dict((k, _readonly(v)) for k, v in value.items())
+    return value
+
+
+def _freeze(value):
+    """Make the arrays in `value` and the arrays they are views of read-only, with copies of its containers."""
+    if isinstance(value, np.ndarray):
+        arr = value
+        while isinstance(arr, np.ndarray):
+            # a view can be made writeable again while its base is writeable
+            arr.flags.writeable = False
+            arr = arr.base
+        return value
+    elif isinstance(value, list):
+        return [_freeze(v) for v in value]
+    elif isinstance(value, dict):
+        return dict((k, _freeze(v)) for k, v in value.items())
+    return value
+
+
+def _nbytes(value, seen=None):
+    """
+    Get the memory held by the arrays in `value` in bytes.
+
+    A view is counted as the array owning its data, and every such array
+    only once, e.g. a broadcast view of a single value takes the size of
+    the value and not the size of the view.
+    """
+    if seen is None:
+        seen = set()
+    if isinstance(value, np.ndarray):
+        while isinstance(value.base, np.ndarray):
+            value = value.base
+        if id(value) in seen:
+            return 0
+        seen.add(id(value))
+        return value.nbytes
+    elif isinstance(value, list):
+        return sum(_nbytes(v, seen) for v in value)
+    elif isinstance(value, dict):
+        return sum(_nbytes(v, seen) for v in value.values())
+    return 0
+
+
+class MemoryCache(object):
+    """
+    In-process least recently used cache of xrdml data dictionaries.
+
+    The entries are keyed by the absolute path and the stat signature
+    (modification time, size and inode) of the files, so a changed file is
+    read again. The cached arrays are read-only and returned as read-only
+    views, so that callers can not corrupt the cached data.
+
+    Parameters
+    ----------
+    max_size : int, optional
+        The maximal size of the cached arrays in bytes [Default: 256 MiB].
+
+    Attributes
+    ----------
+    hits : int
+        The number of lookups found in the cache.
+    misses : int
+        The number of lookups not found in the cache.
+    evictions : int
+        The number of entries removed to respect `max_size`.
+    """
+
+    def __init__(self, max_size=DEFAULT_MEMORY_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_key(self, filename, options=''):
+        """
+        Get the cache key of a file.
+
+        Parameters
+        ----------
+        filename : str
+            The filename of the xrdml file.
+        options : str, optional
+            A description of the read options [Default: ''].
+
+        Returns
+        -------
+        tuple
+            The cache key.
+        """
+        stat = os.stat(filename)
+        return os.path.abspath(filename), stat.st_mtime, stat.st_size, stat.st_ino, options
+
+    def get(self, key):
+        """
+        Get an entry from the cache.
+
+        Parameters
+        ----------
+        key : tuple
+            The cache key, see `get_key`.
+
+        Returns
+        -------
+        dict or None
+            The data dictionary with read-only arrays or None if the entry
+            is not in the cache.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.pop(key)
+            self._entries[key] = entry
+            self.hits += 1
+        return _readonly(entry[0])
+
+    def put(self, key, data):
+        """
+        Add an entry to the cache and remove the least recently used entries
+        until the cache fits into `max_size`.
+
+        Parameters
+        ----------
+        key : tuple
+            The cache key, see `get_key`.
+        data : dict
+            A xrdml data dictionary, its arrays and the arrays they are
+            views of are made read-only.
+
+        Returns
+        -------
+        dict
+            The data dictionary with read-only views of the arrays.
+        """
+        data = _freeze(data)
+        nbytes = _nbytes(data)
+        if nbytes > self.max_size:
+            return _readonly(data)
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            self._entries[key] = (data, nbytes)
+            self.size += nbytes
+            while self.size > self.max_size:
+                _, (_, size) = self._entries.popitem(last=False)
+                self.size -= size
+                self.evictions += 1
+        return _readonly(data)
+
+    def clear(self):
+        """Remove all entries from the cache and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """
+        Get statistics of the cache.
+
+        Returns
+        -------
+        dict
+            The number of 'entries', their 'size' in bytes, the 'max_size' and
+            the 'hits', 'misses' and 'evictions' counters.
+        """
+        with self._lock:
+            return {'entries': len(self._entries),
+                    'size': self.size,
+                    'max_size': self.max_size,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions}
+
+
+# the cache used by `read_xrdml(..., memory_cache=True)`
+memory_cache = MemoryCache()
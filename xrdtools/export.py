@@ -0,0 +1,143 @@
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import json
+
+import numpy as np
+
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+ARRAY_KEYS = ['data', '2Theta', 'Omega', 'x', 'time', 'variance']
+
+METADATA_KEYS = ['filename', 'sample', 'status', 'measType', 'scanAxis', 'stepAxis',
+                 'substrate', 'hkl', 'Lambda', 'kType', 'kAlpha1', 'kAlpha2', 'kBeta',
+                 'kAlphaRatio', 'xlabel', 'ylabel', 'xunit', 'yunit']
+
+
+def get_arrays(data):
+    """Get the data arrays of a xrdml data dictionary.
+
+    Parameters
+    ----------
+    data : dict
+        A xrdml data dictionary.
+
+    Returns
+    -------
+    dict
+        The arrays of `ARRAY_KEYS` found in `data`.
+    """
+    return {key: np.asarray(data[key]) for key in ARRAY_KEYS if key in data}
+
+
+def get_metadata(data):
+    """Get the metadata of a xrdml data dictionary.
+
+    Parameters
+    ----------
+    data : dict
+        A xrdml data dictionary.
+
+    Returns
+    -------
+    dict
+        The settings of `METADATA_KEYS` found in `data` as plain python
+        objects, the hkl values as a list [h, k, l]. Undefined settings
+        are skipped.
+    """
+    metadata = {}
+    for key in METADATA_KEYS:
+        if key not in data:
+            continue
+        value = data[key]
+        if key == 'hkl':
+            value = [value[hkl] for hkl in 'hkl']
+            if None in value:
+                continue
+        elif isinstance(value, np.generic):
+            value = value.item()
+        if value is not None:
+            metadata[key] = value
+    return metadata
+
+
+def to_npz(data, filename):
+    """Save the arrays and metadata of a xrdml data dictionary to a `.npz` file.
+
+    The metadata is stored as 0D arrays, the hkl values as an array of three
+    values, next to the data arrays.
+
+    Parameters
+    ----------
+    data : dict
+        A xrdml data dictionary.
+    filename : str or file
+        The filename or file object to write to.
+    """
+    arrays = get_arrays(data)
+    for key, value in get_metadata(data).items():
+        arrays[key] = np.asarray(value)
+    np.savez(filename, **arrays)
+
+
+def to_hdf5(data, filename):
+    """Save the arrays and metadata of a xrdml data dictionary to a HDF5 file.
+
+    The arrays are stored as datasets and the metadata as attributes of the
+    root group. Requires the optional package h5py.
+
+    Parameters
+    ----------
+    data : dict
+        A xrdml data dictionary.
+    filename : str
+        The filename to write to.
+    """
+    if h5py is None:
+        raise ImportError('The HDF5 export requires the package h5py.')
+
+    with h5py.File(filename, 'w') as f:
+        for key, value in get_arrays(data).items():
+            f.create_dataset(key, data=value)
+        for key, value in get_metadata(data).items():
+            f.attrs[key] = value
+
+
+def to_parquet(data, filename):
+    """Save the data of a xrdml data dictionary to a Parquet file.
+
+    The arrays are stored flattened as columns, like the columns of the text
+    export, and the metadata as json encoded key-value metadata of the table.
+    Requires the optional package pyarrow.
+
+    Parameters
+    ----------
+    data : dict
+        A xrdml data dictionary.
+    filename : str
+        The filename to write to.
+    """
+    if pyarrow is None:
+        raise ImportError('The Parquet export requires the package pyarrow.')
+
+    arrays = get_arrays(data)
+    size = arrays['data'].size
+    columns = {key: np.broadcast_to(value, arrays['data'].shape).ravel()
+               for key, value in arrays.items() if value.size in [1, size]}
+    table = pyarrow.Table.from_pydict(columns)
+    metadata = {key: json.dumps(value) for key, value in get_metadata(data).items()}
+    table = table.replace_schema_metadata(metadata)
+    pyarrow.parquet.write_table(table, filename)
+
+
+EXPORTERS = {'npz': to_npz,
+             'h5': to_hdf5,
+             'parquet': to_parquet}
@@ -0,0 +1,234 @@
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import numpy as np
+
+from xrdtools.utils import angle2qvector, q2hkl_map
+
+REGRID_METHODS = ('histogram', 'bilinear')
+
+DEFAULT_CHUNK_SIZE = 2 ** 20
+
+
+def _chunks(arrays, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Iterate over broadcast arrays in flat chunks of about `chunk_size` points.
+
+    The arrays are sliced along their first axis before they are flattened,
+    so broadcast views are only expanded one chunk at a time.
+
+    Parameters
+    ----------
+    arrays : list of array-like
+        Arrays which can be broadcast against each other.
+    chunk_size : int, optional
+        The number of points per chunk [Default: 2**20].
+
+    Yields
+    ------
+    list of ndarray
+        The 1D chunks of the arrays.
+    """
+    arrays = np.broadcast_arrays(*[np.atleast_1d(np.asarray(a, dtype=float)) for a in arrays])
+    step = max(1, chunk_size // max(1, int(np.prod(arrays[0].shape[1:]))))
+    for start in range(0, len(arrays[0]), step):
+        yield [a[start:start + step].ravel() for a in arrays]
+
+
+def _get_range(chunks):
+    """Get the range ((xmin, xmax), (ymin, ymax)) of the finite points of `chunks`."""
+    xmin = ymin = np.inf
+    xmax = ymax = -np.inf
+    for x, y, _ in chunks:
+        valid = np.isfinite(x) & np.isfinite(y)
+        if valid.any():
+            xmin, xmax = min(xmin, x[valid].min()), max(xmax, x[valid].max())
+            ymin, ymax = min(ymin, y[valid].min()), max(ymax, y[valid].max())
+    if not np.isfinite([xmin, xmax, ymin, ymax]).all():
+        raise ValueError('The points have no finite coordinates.')
+    return (xmin, xmax), (ymin, ymax)
+
+
+def _accumulate(chunks, bins, range, method):
+    """
+    Accumulate the values of `chunks` on a regular grid.
+
+    Parameters
+    ----------
+    chunks : iterable
+        An iterable of (x, y, values) tuples of 1D arrays.
+    bins : tuple of int
+        The number of bins (nx, ny).
+    range : tuple
+        The limits ((xmin, xmax), (ymin, ymax)) of the grid.
+    method : {'histogram', 'bilinear'}
+        Bin the values or distribute them bilinearly on the bin centers.
+
+    Returns
+    -------
+    sums : ndarray
+        The weighted sum of the values per bin, shape (nx, ny).
+    weights : ndarray
+        The sum of the weights per bin, shape (nx, ny).
+    """
+    nx, ny = bins
+    (xmin, xmax), (ymin, ymax) = range
+    sx = nx / (xmax - xmin) if xmax > xmin else 0.
+    sy = ny / (ymax - ymin) if ymax > ymin else 0.
+    sums = np.zeros(nx * ny)
+    weights = np.zeros(nx * ny)
+
+    for x, y, values in chunks:
+        valid = ((x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax) & np.isfinite(values))
+        fx = (x[valid] - xmin) * sx
+        fy = (y[valid] - ymin) * sy
+        values = values[valid]
+
+        if method == 'histogram':
+            # the upper edge belongs to the last bin, as in np.histogram2d
+            ix = np.minimum(fx.astype(np.intp), nx - 1)
+            iy = np.minimum(fy.astype(np.intp), ny - 1)
+            index = ix * ny + iy
+            sums += np.bincount(index, weights=values, minlength=nx * ny)
+            weights += np.bincount(index, minlength=nx * ny)
+            continue
+
+        # position relative to the bin centers
+        fx -= 0.5
+        fy -= 0.5
+        ix = np.floor(fx).astype(np.intp)
+        iy = np.floor(fy).astype(np.intp)
+        wx = fx - ix
+        wy = fy - iy
+        for dx, dy, weight in [(0, 0, (1 - wx) * (1 - wy)), (1, 0, wx * (1 - wy)),
+                               (0, 1, (1 - wx) * wy), (1, 1, wx * wy)]:
+            jx = ix + dx
+            jy = iy + dy
+            inside = (jx >= 0) & (jx < nx) & (jy >= 0) & (jy < ny)
+            index = jx[inside] * ny + jy[inside]
+            sums += np.bincount(index, weights=(weight * values)[inside], minlength=nx * ny)
+            weights += np.bincount(index, weights=weight[inside], minlength=nx * ny)
+
+    return sums.reshape(nx, ny), weights.reshape(nx, ny)
+
+
+def _finish(sums, weights, range):
+    """Normalize the accumulated values and compute the bin edges."""
+    (xmin, xmax), (ymin, ymax) = range
+    with np.errstate(invalid='ignore', divide='ignore'):
+        grid = np.where(weights > 0, sums / weights, np.nan)
+    x_edges = np.linspace(xmin, xmax, sums.shape[0] + 1)
+    y_edges = np.linspace(ymin, ymax, sums.shape[1] + 1)
+    return grid, x_edges, y_edges
+
+
+def _check(bins, method):
+    """Check the regrid arguments and return the number of bins as (nx, ny)."""
+    if method not in REGRID_METHODS:
+        raise ValueError('Unknown method "{}", use one of {}.'.format(method, list(REGRID_METHODS)))
+    if np.ndim(bins) == 0:
+        bins = (bins, bins)
+    return int(bins[0]), int(bins[1])
+
+
+def regrid(x, y, values, bins=256, range=None, method='histogram', chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Map scattered points onto a regular grid.
+
+    Parameters
+    ----------
+    x, y : array-like
+        The coordinates of the points.
+    values : array-like
+        The values of the points, e.g. the intensities.
+    bins : int or tuple of int, optional
+        The number of bins in x and y [Default: 256].
+    range : tuple or None, optional
+        The limits ((xmin, xmax), (ymin, ymax)) of the grid, points outside
+        are ignored. Defaults to the range of the points [Default: None].
+    method : {'histogram', 'bilinear'}, optional
+        'histogram' averages the values of the points in each bin,
+        'bilinear' distributes every value on the four nearest bin centers
+        with bilinear weights and normalizes by the sum of the weights,
+        which gives smoother maps for sparse points [Default: 'histogram'].
+    chunk_size : int, optional
+        The number of points processed at once, which bounds the memory
+        used for temporary arrays [Default: 2**20].
+
+    Returns
+    -------
+    grid : ndarray
+        The mean value per bin, NaN for empty bins. As for
+        `numpy.histogram2d`, the first axis is x and the second axis is y.
+    x_edges : ndarray
+        The bin edges in x.
+    y_edges : ndarray
+        The bin edges in y.
+    """
+    bins = _check(bins, method)
+    if range is None:
+        range = _get_range(_chunks([x, y, values], chunk_size))
+    sums, weights = _accumulate(_chunks([x, y, values], chunk_size), bins, range, method)
+    return _finish(sums, weights, range)
+
+
+def get_qgrid(data, bins=256, range=None, omega_offset=0, space='q', lattice_params=(3.905, 3.905, 3.905),
+              hkl=None, method='histogram', chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Map an area measurement onto a regular grid in reciprocal space.
+
+    The reciprocal space coordinates are computed chunk by chunk with
+    `xrdtools.utils.angle2qvector`, so the memory used does not grow with
+    the size of the map.
+
+    Parameters
+    ----------
+    data : dict
+        A xrdml data dictionary of an area measurement.
+    bins : int or tuple of int, optional
+        The number of bins along kpar (h) and kperp (l) [Default: 256].
+    range : tuple or None, optional
+        The limits of the grid, see `regrid` [Default: None].
+    omega_offset : float, optional
+        Offset for the omega angle [Default: 0].
+    space : {'q', 'hkl'}, optional
+        Grid in the (kpar, kperp) coordinates of `xrdtools.utils.get_qmap`
+        or in the reciprocal lattice units of `xrdtools.utils.q2hkl_map`
+        [Default: 'q'].
+    lattice_params : tuple, optional
+        The lattice parameters for the 'hkl' space [Default: (3.905, 3.905, 3.905)].
+    hkl : dict or None, optional
+        The reflection for the 'hkl' space, defaults to the reflection of
+        the measurement or 001 [Default: None].
+    method : {'histogram', 'bilinear'}, optional
+        The regridding method, see `regrid` [Default: 'histogram'].
+    chunk_size : int, optional
+        The number of points processed at once [Default: 2**20].
+
+    Returns
+    -------
+    grid : ndarray
+        The mean intensity per bin, NaN for empty bins.
+    x_edges : ndarray
+        The bin edges along kpar (h).
+    y_edges : ndarray
+        The bin edges along kperp (l).
+    """
+    bins = _check(bins, method)
+    if space not in ['q', 'hkl']:
+        raise ValueError('Unknown space "{}", use "q" or "hkl".'.format(space))
+    if space == 'hkl' and hkl is None:
+        hkl = data.get('hkl')
+        if hkl is None or None in hkl.values():
+            hkl = None
+
+    def chunks():
+        for tt, om, values in _chunks([data['2Theta'], data['Omega'], data['data']], chunk_size):
+            x, y = angle2qvector(tt, om + omega_offset, data['Lambda'])
+            if space == 'hkl':
+                x, y = q2hkl_map(x, y, lattice_params=lattice_params, hkl=hkl)
+            yield x, y, values
+
+    if range is None:
+        range = _get_range(chunks())
+    sums, weights = _accumulate(chunks(), bins, range, method)
+    return _finish(sums, weights, range)
@@ -0,0 +1,173 @@
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import numpy as np
+
+
+class Measurement(object):
+    """
+    Compact container of the data of a xrdml measurement.
+
+    The items are the same as the keys of the dictionary returned by
+    `xrdtools.read_xrdml`. Axes with a single value are stored as scalars and
+    are returned as read-only broadcast views of the shape of the data, so
+    they take no memory. The same applies to axes with a single value per
+    scan of an area measurement. Items with a name which is a valid identifier can
+    also be accessed as attributes, e.g. `measurement.measType`.
+
+    Parameters
+    ----------
+    data : dict
+        Dictionary containing the measurement data and settings.
+    constants : dict, optional
+        The shape and dtype of the arrays for the keys of `data` which are
+        broadcast to the shape of the data, i.e. which hold a single value or
+        a single value per scan [Default: None].
+
+    Examples
+    --------
+    >>> measurement = xrdtools.read_measurement('test_scan.xrdml')
+    >>> measurement.is_constant('time')
+    True
+    >>> measurement['time'].shape == measurement['data'].shape
+    True
+    >>> data = measurement.to_dict()
+    """
+
+    __slots__ = ('_items', '_constants')
+
+    def __init__(self, data, constants=None):
+        self._items = dict(data)
+        self._constants = {}
+        for key, (shape, dtype) in (constants or {}).items():
+            value = np.asarray(data[key])
+            if value.size == 1:
+                value = np.dtype(dtype).type(value.item())
+            else:
+                value = value.astype(dtype, copy=False)
+            self._constants[key] = (value, tuple(shape))
+            # an alias of a constant axis
+            if key in ['2Theta', 'Omega', 'Phi', 'Psi', 'X', 'Y', 'Z'] and data.get('x') is data[key]:
+                self._constants['x'] = self._constants[key]
+        for key in self._constants:
+            self._items[key] = None
+
+    def __getitem__(self, key):
+        if key in self._constants:
+            value, shape = self._constants[key]
+            return np.broadcast_to(value, shape)
+        return self._items[key]
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError("'Measurement' object has no attribute '{}'".format(name))
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getstate__(self):
+        return self._items, self._constants
+
+    def __setstate__(self, state):
+        self._items, self._constants = state
+
+    def __repr__(self):
+        return '<Measurement {!r} ({}, shape {})>'.format(self._items.get('filename'), self._items.get('measType'),
+                                                          self.shape)
+
+    def keys(self):
+        """Get the names of the items."""
+        return list(self._items)
+
+    def get(self, key, default=None):
+        """Get an item or `default` if it does not exist."""
+        return self[key] if key in self else default
+
+    @property
+    def shape(self):
+        """tuple: The shape of the intensity data."""
+        return np.shape(self._items.get('data'))
+
+    @property
+    def nbytes(self):
+        """int: The memory used by the arrays of the measurement in bytes."""
+        values = list(self._items.values()) + [value for value, _ in self._constants.values()]
+        return sum(value.nbytes for value in values if isinstance(value, np.ndarray))
+
+    def is_constant(self, key):
+        """
+        Check if an axis has a single value for all data points.
+
+        Parameters
+        ----------
+        key : str
+            The name of the axis, e.g. 'time'.
+
+        Returns
+        -------
+        bool
+            True if the axis is stored as a scalar.
+        """
+        return key in self._constants and np.ndim(self._constants[key][0]) == 0
+
+    def constant(self, key):
+        """
+        Get the single value of a constant axis.
+
+        Parameters
+        ----------
+        key : str
+            The name of the axis, e.g. 'time'.
+
+        Returns
+        -------
+        numpy scalar
+            The value of the axis for all data points.
+        """
+        if not self.is_constant(key):
+            raise ValueError('The axis "{}" is not constant.'.format(key))
+        return self._constants[key][0]
+
+    def to_dict(self, broadcast=False):
+        """
+        Get the measurement as a data dictionary.
+
+        By default the broadcast axes are expanded to full (writeable) arrays,
+        so the dictionary is the same as the one returned by
+        `xrdtools.read_xrdml`.
+
+        Parameters
+        ----------
+        broadcast : bool, optional
+            If True, the broadcast axes are read-only broadcast views instead
+            of full arrays [Default: False].
+
+        Returns
+        -------
+        dict
+            A dictionary with all relevant data of the measurement.
+        """
+        data = dict(self._items)
+        arrays = {}
+        for key, (value, shape) in self._constants.items():
+            if key == 'x':
+                continue
+            array = np.broadcast_to(value, shape)
+            if not broadcast:
+                array = np.array(array)
+            # like numpy arithmetic, a 0D result is a scalar
+            arrays[key] = data[key] = array if shape else array[()]
+        if 'x' in self._constants:
+            # 'x' is the same array as its axis, as in `read_xrdml`
+            data['x'] = next(arrays[key] for key, value in self._constants.items()
+                             if key != 'x' and value is self._constants['x'])
+        return data
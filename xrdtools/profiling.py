@@ -0,0 +1,249 @@
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+try:
+    import tracemalloc
+except ImportError:  # python 2
+    tracemalloc = None
+
+# time.perf_counter is not available in python 2
+_timer = getattr(time, 'perf_counter', time.time)
+
+_local = threading.local()
+
+
+class _NullStage(object):
+    """A stage which records nothing, used when no profiler is active."""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def active():
+    """
+    Get the profiler activated in the current thread.
+
+    Returns
+    -------
+    Profiler or None
+        The active profiler or None if no profiler is active.
+    """
+    return getattr(_local, 'profiler', None)
+
+
+def stage(name, scan=None, nbytes=0):
+    """
+    Record a stage with the active profiler, see `Profiler.stage`.
+
+    If no profiler is active, nothing is recorded.
+    """
+    profiler = active()
+    if profiler is None:
+        return _NULL_STAGE
+    return profiler.stage(name, scan=scan, nbytes=nbytes)
+
+
+def add_bytes(nbytes):
+    """Add decoded bytes to the current stage of the active profiler, if any."""
+    profiler = active()
+    if profiler is not None:
+        profiler.add_bytes(nbytes)
+
+
+def iter_stage(iterable, name):
+    """
+    Record the time to get every item of `iterable` as stage `name`.
+
+    The items are numbered as scans. If no profiler is active, `iterable` is
+    returned as is.
+    """
+    profiler = active()
+    if profiler is None:
+        return iterable
+
+    def items():
+        iterator = iter(iterable)
+        k = 0
+        while True:
+            with profiler.stage(name, scan=k) as record:
+                item = next(iterator, None)
+                if item is None:
+                    # the rest of the source after the last item
+                    record['scan'] = None
+            if item is None:
+                return
+            yield item
+            k += 1
+    return items()
+
+
+class Profiler(object):
+    """
+    Profiler of the stages of loading xrdml files.
+
+    The profiler is activated for the current thread with a `with`
+    statement. While it is active, the loading functions of `xrdtools.io`
+    record their stages: 'parse' (xml parsing, per scan when the file is
+    streamed, including the schema validation), 'validate', 'decode'
+    (per scan, with the number of decoded bytes of text), 'stack' (per
+    scan), 'reduce' (of repeated scans), 'metadata' (the lookups of the
+    settings and the normalization of the axes) and 'cache' (loading from
+    the persistent cache).
+
+    Every record is a dictionary with the 'stage', the 'scan' number (or
+    None), the wall 'time' in seconds, the processed 'bytes' (the size of
+    the file for 'parse', the decoded text for 'decode') and the net
+    'allocated' memory in bytes (or None if allocations are not tracked).
+    The time and the allocations of a stage do not include the ones of
+    stages recorded within it.
+
+    Parameters
+    ----------
+    callback : callable or None, optional
+        A function called with every record [Default: None].
+    logger : logging.Logger or None, optional
+        If given, every record is emitted as a log record with the record
+        dictionary as attribute `profile`, and a summary is emitted when
+        the profiler is deactivated [Default: None].
+    level : int, optional
+        The level of the log records [Default: logging.DEBUG].
+    allocations : bool, optional
+        If True, the allocations are tracked with `tracemalloc`, which is
+        started while the profiler is active. This slows down the loading,
+        use False for accurate times. Python 2 has no `tracemalloc`
+        [Default: True].
+
+    Examples
+    --------
+    >>> with xrdtools.profiling.Profiler() as profiler:
+    ...     data = xrdtools.read_xrdml('test_area.xrdml')
+    >>> profiler.summary()['decode']['time']
+    """
+
+    def __init__(self, callback=None, logger=None, level=logging.DEBUG, allocations=True):
+        self.callback = callback
+        self.logger = logger
+        self.level = level
+        self.allocations = allocations and tracemalloc is not None
+        self.records = []
+        self._stack = []
+        self._previous = []
+        self._started_tracing = False
+
+    def __enter__(self):
+        if self.allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._previous.append(active())
+        _local.profiler = self
+        return self
+
+    def __exit__(self, *exc_info):
+        _local.profiler = self._previous.pop()
+        del self._stack[:]
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        if self.logger is not None and self.records and self.logger.isEnabledFor(self.level):
+            summary = self.summary()
+            self.logger.log(self.level, 'profile: {}'.format(', '.join(
+                '{} {:.6f} s'.format(name, total['time']) for name, total in summary.items())),
+                extra={'profile': summary})
+        return False
+
+    def _memory(self):
+        """Get the currently traced memory or None."""
+        if self.allocations and tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()[0]
+        return None
+
+    def _pause(self, now, memory):
+        """Add the time and memory since the start of the current stage to its record."""
+        if self._stack:
+            record, start, start_memory = self._stack[-1]
+            record['time'] += now - start
+            if memory is not None and start_memory is not None:
+                record['allocated'] += memory - start_memory
+
+    @contextmanager
+    def stage(self, name, scan=None, nbytes=0):
+        """
+        Record a stage.
+
+        Parameters
+        ----------
+        name : str
+            The name of the stage.
+        scan : int or None, optional
+            The scan number, if the stage concerns a single scan.
+        nbytes : int, optional
+            The number of decoded bytes, more can be added with `add_bytes`.
+
+        Yields
+        ------
+        dict
+            The record of the stage, it is complete once the stage ends.
+        """
+        memory = self._memory()
+        record = {'stage': name, 'scan': scan, 'time': 0., 'bytes': nbytes,
+                  'allocated': 0 if memory is not None else None}
+        now = _timer()
+        self._pause(now, memory)
+        self._stack.append([record, now, memory])
+        try:
+            yield record
+        finally:
+            memory = self._memory()
+            now = _timer()
+            self._pause(now, memory)
+            if self._stack:
+                self._stack.pop()
+            # resume the enclosing stage
+            if self._stack:
+                self._stack[-1][1:] = [now, memory]
+            self._add(record)
+
+    def add_bytes(self, nbytes):
+        """Add decoded bytes to the current stage."""
+        if self._stack:
+            self._stack[-1][0]['bytes'] += nbytes
+
+    def _add(self, record):
+        """Store a record and pass it to the callback and the logger."""
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+        if self.logger is not None and self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, 'profile: {} {}{:.6f} s, {} bytes, {} bytes allocated'.format(
+                record['stage'], '' if record['scan'] is None else 'scan {} '.format(record['scan']),
+                record['time'], record['bytes'], record['allocated']), extra={'profile': record})
+
+    def summary(self):
+        """
+        Get the totals of all recorded stages.
+
+        Returns
+        -------
+        dict
+            For every stage a dictionary with the total 'time', 'bytes' and
+            'allocated' memory and the number of records 'count'.
+        """
+        totals = {}
+        for record in self.records:
+            total = totals.setdefault(record['stage'], {'time': 0., 'bytes': 0, 'allocated': None, 'count': 0})
+            total['time'] += record['time']
+            total['bytes'] += record['bytes']
+            total['count'] += 1
+            if record['allocated'] is not None:
+                total['allocated'] = (total['allocated'] or 0) + record['allocated']
+        return totals
@@ -0,0 +1,110 @@
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import numpy as np
+
+REDUCTIONS = ('mean', 'median', 'sum', 'sigma-clip')
+
+
+def sigma_clip_mask(scans, sigma=3., maxiters=5):
+    """
+    Find the outliers of repeated scans.
+
+    A point is rejected if it deviates more than `sigma` standard deviations
+    from the median of the points of all scans at the same position. The
+    rejection is repeated with the remaining points until no more points are
+    rejected or `maxiters` is reached.
+
+    Parameters
+    ----------
+    scans : ndarray
+        The intensities with one scan per row.
+    sigma : float, optional
+        The rejection threshold in standard deviations [Default: 3].
+    maxiters : int, optional
+        The maximal number of iterations [Default: 5].
+
+    Returns
+    -------
+    ndarray
+        A boolean array of the shape of `scans`, True for the points kept.
+    """
+    scans = np.asarray(scans, dtype=float)
+    keep = np.isfinite(scans)
+    for _ in range(maxiters):
+        kept = np.where(keep, scans, np.nan)
+        center = np.nanmedian(kept, axis=0)
+        std = np.nanstd(kept, axis=0)
+        new_keep = keep & (np.abs(scans - center) <= sigma * std)
+        if (new_keep == keep).all():
+            break
+        keep = new_keep
+    return keep
+
+
+def reduce_scans(scans, method='mean', time=None, sigma=3., maxiters=5):
+    """
+    Reduce repeated scans to a single scan.
+
+    Parameters
+    ----------
+    scans : ndarray
+        The intensities (in cps) with one scan per row, a 1D array is a
+        single scan.
+    method : {'mean', 'median', 'sum', 'sigma-clip'}, optional
+        The reduction along the scans: the mean, the median, the sum or the
+        mean of the points kept by `sigma_clip_mask` [Default: 'mean'].
+    time : ndarray or float or None, optional
+        The counting time of the points, broadcastable to the shape of
+        `scans`. If given, the variance of the reduced intensities is
+        estimated from the counting statistics [Default: None].
+    sigma : float, optional
+        The rejection threshold of 'sigma-clip' [Default: 3].
+    maxiters : int, optional
+        The maximal number of rejection iterations of 'sigma-clip'
+        [Default: 5].
+
+    Returns
+    -------
+    reduced : ndarray
+        The reduced intensities.
+    variance : ndarray or None
+        The variance of the reduced intensities or None if `time` is not
+        given.
+
+    Notes
+    -----
+    The counts of a point are Poisson distributed, so the variance of an
+    intensity `I` in cps measured during the time `t` is `I / t`. The
+    variance of the median is approximated by `pi / 2` times the variance
+    of the mean.
+    """
+    if method not in REDUCTIONS:
+        raise ValueError('Unknown reduction "{}", use one of {}.'.format(method, list(REDUCTIONS)))
+
+    scans = np.atleast_2d(scans)
+    nb_scans = len(scans)
+    if time is not None:
+        point_variance = scans / np.broadcast_to(time, scans.shape)
+
+    variance = None
+    if method == 'sum':
+        reduced = np.add.reduce(scans, axis=0)
+        if time is not None:
+            variance = np.add.reduce(point_variance, axis=0)
+    elif method == 'mean':
+        # same summation order as adding the scans one after the other
+        reduced = np.add.reduce(scans, axis=0) / nb_scans
+        if time is not None:
+            variance = np.add.reduce(point_variance, axis=0) / nb_scans ** 2
+    elif method == 'median':
+        reduced = np.median(scans, axis=0)
+        if time is not None:
+            variance = np.pi / 2 * np.add.reduce(point_variance, axis=0) / nb_scans ** 2
+    else:
+        keep = sigma_clip_mask(scans, sigma=sigma, maxiters=maxiters)
+        nb_kept = keep.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            reduced = np.where(keep, scans, 0).sum(axis=0) / nb_kept
+            if time is not None:
+                variance = np.where(keep, point_variance, 0).sum(axis=0) / nb_kept ** 2
+    return reduced, variance
@@ -0,0 +1,223 @@
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import os
+import io
+import json
+import shutil
+import logging
+import tempfile
+
+from xrdtools import cache
+from xrdtools.batch import iter_many, find_files
+from xrdtools.export import get_metadata
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+
+_STORE_INDEX = 'store.json'
+
+
+def open(path, mmap_mode='c'):
+    """
+    Open a dataset store, it is created if it does not exist.
+
+    Parameters
+    ----------
+    path : str
+        The directory of the store.
+    mmap_mode : {None, 'r', 'c'}, optional
+        The memory-map mode of the arrays, see `numpy.load` [Default: 'c'].
+
+    Returns
+    -------
+    Store
+        The dataset store.
+    """
+    return Store(path, mmap_mode=mmap_mode)
+
+
+class Store(object):
+    """
+    Persistent store of many xrdml measurements.
+
+    Every measurement is saved as memory-mapped `.npy` arrays in the format
+    of the cache of `xrdtools.cache`. A small json index holds the metadata
+    of all measurements (sample, substrate, hkl, measType, Lambda, scanAxis,
+    ...), so opening a store only reads the index and the arrays are only
+    read from disk when they are accessed.
+
+    The measurements are identified by the absolute filename of their
+    xrdml file. Use `xrdtools.store.open` to open a store.
+
+    Parameters
+    ----------
+    path : str
+        The directory of the store.
+    mmap_mode : {None, 'r', 'c'}, optional
+        The memory-map mode of the arrays, see `numpy.load` [Default: 'c'].
+
+    Examples
+    --------
+    >>> store = xrdtools.store.open('my_store')
+    >>> added, errors = store.ingest('measurements/')
+    >>> names = store.find(measType='Area measurement', substrate='SrTiO3')
+    >>> data = store[names[0]]
+    """
+
+    def __init__(self, path, mmap_mode='c'):
+        self.path = path
+        self.mmap_mode = mmap_mode
+        self._index = {}
+        index_file = os.path.join(path, _STORE_INDEX)
+        if os.path.exists(index_file):
+            with io.open(index_file, 'r', encoding='utf8') as f:
+                index = json.loads(f.read())
+            if index.get('version') == STORE_VERSION:
+                self._index = index['entries']
+            else:
+                logger.warning('The store "{}" was written by another version and is rebuilt.'.format(path))
+
+    def _write_index(self):
+        """Write the index to a temporary file and move it into place."""
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        fd, tmp = tempfile.mkstemp(prefix='.tmp-', dir=self.path)
+        with io.open(fd, 'w', encoding='utf8') as f:
+            f.write(json.dumps({'version': STORE_VERSION, 'entries': self._index}, ensure_ascii=False))
+        # os.replace is not available in python 2
+        getattr(os, 'replace', os.rename)(tmp, os.path.join(self.path, _STORE_INDEX))
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        return iter(sorted(self._index))
+
+    def __len__(self):
+        return len(self._index)
+
+    def __getitem__(self, name):
+        entry = self._index[name]
+        data = cache.load(self.path, entry['key'], mmap_mode=self.mmap_mode)
+        if data is None:
+            raise KeyError('The data of "{}" is missing in the store.'.format(name))
+        return data
+
+    def keys(self):
+        """Get the names of the measurements."""
+        return list(self)
+
+    def metadata(self, name):
+        """
+        Get the metadata of a measurement.
+
+        Parameters
+        ----------
+        name : str
+            The name of the measurement.
+
+        Returns
+        -------
+        dict
+            The metadata as returned by `xrdtools.export.get_metadata`.
+        """
+        return self._index[name]['metadata']
+
+    def table(self):
+        """
+        Get the metadata of all measurements.
+
+        Returns
+        -------
+        list of dict
+            The metadata of every measurement with its 'name'.
+        """
+        return [dict(self._index[name]['metadata'], name=name) for name in self]
+
+    def find(self, **criteria):
+        """
+        Find measurements by their metadata.
+
+        Parameters
+        ----------
+        **criteria
+            The values of the metadata, e.g. `measType='Scan'`.
+
+        Returns
+        -------
+        list of str
+            The names of the matching measurements.
+        """
+        return [name for name in self
+                if all(self._index[name]['metadata'].get(key) == value for key, value in criteria.items())]
+
+    def _is_current(self, filename):
+        """Check if the entry of `filename` is up to date with the file."""
+        entry = self._index.get(filename)
+        if entry is None:
+            return False
+        stat = os.stat(filename)
+        return entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size
+
+    def ingest(self, paths, workers=1, **kwargs):
+        """
+        Add xrdml files to the store.
+
+        Only new files and files which changed since they were added are
+        loaded with `xrdtools.read_xrdml`.
+
+        Parameters
+        ----------
+        paths : str or list of str
+            Filenames of xrdml files or directories which are searched
+            recursively for `.xrdml` files.
+        workers : int or None, optional
+            The number of processes loading the files, see
+            `xrdtools.read_many` [Default: 1].
+        **kwargs
+            Keyword arguments passed to `read_xrdml`.
+
+        Returns
+        -------
+        added : list of str
+            The names of the added or updated measurements.
+        errors : dict
+            The exceptions raised while loading, with the filenames as keys.
+        """
+        filenames = [filename for filename in find_files(paths) if not self._is_current(filename)]
+        added = []
+        errors = {}
+        old_keys = []
+        for filename, data, error in iter_many(filenames, workers=workers, **kwargs):
+            if error is not None:
+                errors[filename] = error
+                continue
+            stat = os.stat(filename)
+            key = cache.get_key(filename)
+            cache.store(self.path, key, data)
+            if filename in self._index and self._index[filename]['key'] != key:
+                old_keys.append(self._index[filename]['key'])
+            self._index[filename] = {'key': key,
+                                     'mtime': stat.st_mtime,
+                                     'size': stat.st_size,
+                                     'metadata': get_metadata(data)}
+            added.append(filename)
+        if added:
+            self._write_index()
+        for key in old_keys:
+            shutil.rmtree(os.path.join(self.path, key), ignore_errors=True)
+        return added, errors
+
+    def remove(self, name):
+        """
+        Remove a measurement from the store.
+
+        Parameters
+        ----------
+        name : str
+            The name of the measurement.
+        """
+        entry = self._index.pop(name)
+        self._write_index()
+        shutil.rmtree(os.path.join(self.path, entry['key']), ignore_errors=True)
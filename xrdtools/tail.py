@@ -0,0 +1,215 @@
+from __future__ import unicode_literals, print_function, division, absolute_import
+
+import os
+import re
+import logging
+
+from lxml import etree
+import numpy as np
+
+from xrdtools.io import (SCAN_KEYS, VALIDATION_MODES, _get_parser, _sniff_version, _read_scans, _get_scan_data,
+                         _append_incomplete_scan, read_xrdml_header)
+
+logger = logging.getLogger(__name__)
+
+# the tags with or without a namespace prefix
+_SCAN_START = re.compile(br'<(?:[\w.-]+:)?scan[\s>]')
+
+_SCAN_END = re.compile(br'</(?:[\w.-]+:)?scan\s*>')
+
+_MEASUREMENT_END = re.compile(br'</(?:[\w.-]+:)?xrdMeasurement\s*>')
+
+# the bytes before the read offset, to detect a rewritten file
+_CHECK_SIZE = 64
+
+
+class TailReader(object):
+    """
+    Incremental reader of a xrdml file which is still being written.
+
+    Every call of `poll` decodes only the scans which were added to the
+    file since the last call, instead of the whole file. The reader
+    remembers the position in the file after the last decoded scan. If the
+    file was rewritten with different content before this position, e.g.
+    the status of the measurement changed, the scans are searched again
+    from the beginning, but the scans already returned are not decoded
+    again, and the header is read again.
+
+    A scan which is the last one of the file and is not completed yet is
+    returned as incomplete scan and is read again by the next `poll`.
+
+    Parameters
+    ----------
+    filename : str
+        The filename of the xrdml file.
+    validate : {'namespace-only', 'off'}, optional
+        Validation of the file. A file which is being written can not be
+        validated against the xml schemas, 'namespace-only' checks for a
+        supported xrdml namespace [Default: 'namespace-only'].
+
+    Attributes
+    ----------
+    header : dict or None
+        The settings of the measurement as returned by
+        `xrdtools.read_xrdml_header`, None until the first scan was
+        written. It is updated when the file was rewritten, e.g. with a
+        new status of the measurement.
+    nb_scans : int
+        The number of scans returned by `poll` so far, except the scans
+        still in progress.
+    finished : bool
+        True once the end of the measurement was written.
+
+    Examples
+    --------
+    >>> reader = xrdtools.TailReader('running.xrdml')
+    >>> while not reader.finished:
+    ...     scans = reader.poll()
+    ...     update_display(scans['scannb'], scans.get('data'))
+    ...     time.sleep(1)
+    """
+
+    def __init__(self, filename, validate='namespace-only'):
+        if validate not in VALIDATION_MODES or validate == 'full':
+            raise ValueError('Unknown validation mode "{}", use "namespace-only" or "off".'.format(validate))
+        self.filename = os.path.abspath(filename)
+        self.validate = validate
+        self.header = None
+        self.nb_scans = 0
+        self.finished = False
+        self._nsmap = None
+        self._namespace = None
+        # the header has to be read again after a rewrite
+        self._rewritten = False
+        self._offset = 0
+        # the number of scans in the file before the offset
+        self._nb_offset = 0
+        self._check = b''
+
+    def _read_settings(self):
+        """Read the header and the namespaces, False if the header is not written yet."""
+        try:
+            header = read_xrdml_header(self.filename)
+            with open(self.filename, 'rb') as f:
+                _, root = next(iter(etree.iterparse(f, events=('start',), huge_tree=True)))
+        except (etree.XMLSyntaxError, AttributeError):
+            # the header is incomplete
+            return False
+        if self.validate != 'off' and _sniff_version(root) is None:
+            raise ValueError('The file does not declare a supported xrdml namespace.')
+        self.header = header
+        self._nsmap = root.nsmap
+        self._namespace = etree.QName(root).namespace
+        self._rewritten = False
+        return True
+
+    def _read_chunk(self):
+        """Read the file from the offset, or from the start if it was rewritten."""
+        with open(self.filename, 'rb') as f:
+            if self._offset:
+                f.seek(self._offset - len(self._check))
+                if f.read(len(self._check)) != self._check:
+                    logger.debug('The file "{}" was rewritten, the scans are searched again.'.format(self.filename))
+                    self._offset = 0
+                    self._nb_offset = 0
+                    self._check = b''
+                    self._rewritten = True
+            f.seek(self._offset)
+            return f.read()
+
+    def _set_offset(self, chunk, start, end, nb_scans):
+        """Continue the next poll at `end` of `chunk`, which starts at `start` in the file, after `nb_scans` scans."""
+        self._check = chunk[max(0, end - _CHECK_SIZE):end]
+        self._offset = start + end
+        self._nb_offset = nb_scans
+
+    def _find_scans(self, chunk):
+        """Get the (start, end) positions of the complete scan elements in `chunk`."""
+        positions = []
+        pos = 0
+        while True:
+            match = _SCAN_START.search(chunk, pos)
+            if match is None:
+                break
+            end = _SCAN_END.search(chunk, match.start())
+            if end is None:
+                # the scan is still being written
+                break
+            pos = end.end()
+            positions.append((match.start(), pos))
+        return positions
+
+    def _parse_scans(self, chunk, positions):
+        """Parse the scan elements of `chunk` at `positions` within the namespaces of the file."""
+        namespaces = ' '.join('xmlns="{}"'.format(uri) if prefix is None else 'xmlns:{}="{}"'.format(prefix, uri)
+                              for prefix, uri in self._nsmap.items())
+        start = '<xrdMeasurement {}>'.format(namespaces).encode('utf8')
+        text = b''.join([start] + [chunk[a:b] for a, b in positions] + [b'</xrdMeasurement>'])
+        return list(etree.fromstring(text, _get_parser()))
+
+    def poll(self):
+        """
+        Decode the scans added to the file since the last call.
+
+        Returns
+        -------
+        dict
+            The scan numbers 'scannb' of the new completed scans and their
+            data ('data', 'time', '2Theta', 'Omega', ...) as 2D arrays with
+            one scan per row, as well as the incomplete scans ('iscannb',
+            'idata', 'itime', ...) as lists. The intensities are in cps.
+            Without new scans, 'scannb' and 'iscannb' are empty lists.
+        """
+        data = {'scannb': [], 'iscannb': []}
+        if self.finished or not os.path.exists(self.filename):
+            return data
+        if self.header is None and not self._read_settings():
+            return data
+
+        chunk = self._read_chunk()
+        if self._rewritten and not self._read_settings():
+            # the header is being rewritten
+            return data
+        # the position of the chunk in the file, 0 if the file was rewritten
+        start = self._offset
+        positions = self._find_scans(chunk)
+        finished = _MEASUREMENT_END.search(chunk, positions[-1][1] if positions else 0) is not None
+        # the scans of the chunk which were returned before the file was rewritten
+        nb_returned = self.nb_scans - self._nb_offset
+        if nb_returned:
+            returned = positions[:nb_returned]
+            positions = positions[nb_returned:]
+            if len(returned) < nb_returned:
+                # the rewrite is still in progress, the next poll starts again from the offset
+                self.finished = finished
+                return data
+            # the next poll starts after them, even without new scans
+            self._set_offset(chunk, start, returned[-1][1], self.nb_scans)
+        uid_scans = self._parse_scans(chunk, positions)
+
+        namespace = {'ns': self._namespace}
+        pending = None
+        if uid_scans and not finished and uid_scans[-1].get('status') != 'Completed':
+            pending = uid_scans.pop()
+
+        data = _read_scans(uid_scans, self.header['measType'], namespace=namespace, start=self.nb_scans)
+        if len(data['scannb']) == 1:
+            for key in SCAN_KEYS:
+                if not isinstance(data[key], list):
+                    data[key] = np.atleast_2d(data[key])
+        if pending is not None:
+            data['iscannb'].append(self.nb_scans + len(uid_scans))
+            _append_incomplete_scan(data, _get_scan_data([pending], 0, namespace=namespace))
+
+        # remove the keys without scans
+        for key in list(data):
+            if key not in ['scannb', 'iscannb'] and isinstance(data[key], list) and not data[key]:
+                data.pop(key)
+
+        # the next poll starts after the last scan which does not change anymore
+        nb_final = len(positions) - (1 if pending is not None else 0)
+        if nb_final > 0:
+            self._set_offset(chunk, start, positions[nb_final - 1][1], self.nb_scans + nb_final)
+        self.nb_scans += len(uid_scans)
+        self.finished = finished
+        return data
@@ -1,64 +1,270 @@
 from __future__ import unicode_literals, print_function, division, absolute_import
 
+import io
+import os
 import sys
+import codecs
 from argparse import ArgumentParser
 
 import numpy as np
 import xrdtools
+from xrdtools import cache
+from xrdtools.batch import XRDML_EXTENSIONS, _imap, scan_catalog
+from xrdtools.export import EXPORTERS
 
+CATALOG_COLUMNS = ['filename', 'sample', 'status', 'measType', 'scanAxis', 'stepAxis', 'kType', 'Lambda',
+                   'substrate', 'hkl']
 
-def xrdml():
+
+def _get_columns(data):
+    """Get the columns and labels to export from a xrdml data dictionary.
+
+    Parameters
+    ----------
+    data : dict
+        A xrdml data dictionary.
+
+    Returns
+    -------
+    columns : list of ndarray or None
+        The 1D data columns or None if the measurement type is not supported.
+    labels : list of str
+        The labels of the columns.
+    """
+    if data['measType'] == 'Scan':
+        return [data['x'], data['data']], [data.get('xlabel', ''), 'Intensity']
+
+    elif data['measType'] == 'Area measurement':
+        return ([data['2Theta'].ravel(), data['Omega'].ravel(), data['data'].ravel()],
+                [data.get('xlabel', ''), data.get('ylabel', ''), 'Intensity'])
+
+    return None, []
+
+
+def _write_txt(file_out, columns, labels, fmt='%.18e', delimiter='\t', chunk_size=None):
+    """Write columns of data as text.
+
+    Parameters
+    ----------
+    file_out : str or file
+        The filename or a file object to write to.
+    columns : list of ndarray
+        The 1D data columns of the same length.
+    labels : list of str
+        The labels of the columns, written as header.
+    fmt : str
+        The format of a single value or, with one format per column, of a
+        whole row as for `np.savetxt` [Default: '%.18e'].
+    delimiter : str
+        The delimiter between the columns [Default: '\\t'].
+    chunk_size : int or None
+        If given, the rows are formatted and written in chunks of `chunk_size`
+        rows instead of stacking all columns in memory first [Default: None].
+    """
+    if chunk_size is None:
+        np.savetxt(file_out, np.vstack(columns).T,
+                   fmt=fmt,
+                   delimiter=delimiter,
+                   header=delimiter.join(labels))
+        return
+
+    if not hasattr(file_out, 'write'):
+        with io.open(file_out, 'w') as f:
+            return _write_txt(f, columns, labels, fmt=fmt, delimiter=delimiter, chunk_size=chunk_size)
+
+    # same header and row format as np.savetxt
+    file_out.write('# ' + delimiter.join(labels) + '\n')
+    if fmt.count('%') == 1:
+        row = delimiter.join([fmt] * len(columns)) + '\n'
+    elif fmt.count('%') == len(columns):
+        row = fmt + '\n'
+    else:
+        raise ValueError('fmt has wrong number of % formats: {}'.format(fmt))
+    for start in range(0, len(columns[0]), chunk_size):
+        chunk = np.column_stack([column[start:start + chunk_size] for column in columns])
+        file_out.write((row * len(chunk)) % tuple(chunk.ravel()))
+
+
+def _output_filename(filename, extension):
+    """Get the filename of the exported data of a xrdml file.
+
+    Parameters
+    ----------
+    filename : str
+        The filename of the xrdml file.
+    extension : str
+        The extension of the exported file, without the dot.
+
+    Returns
+    -------
+    str
+        The filename with the extension `extension` instead of the xrdml
+        extension, e.g. of `.xrdml`, `.XRDML` or `.xrdml.gz`, or instead of
+        the last extension for other filenames.
+
+    Raises
+    ------
+    ValueError
+        If the exported file would overwrite the xrdml file.
+    """
+    for xrdml_extension in XRDML_EXTENSIONS[::-1]:
+        if filename.lower().endswith(xrdml_extension):
+            root = filename[:-len(xrdml_extension)]
+            break
+    else:
+        root = os.path.splitext(filename)[0]
+    file_out = '{}.{}'.format(root, extension)
+    if os.path.abspath(file_out) == os.path.abspath(filename):
+        raise ValueError('The exported data would overwrite the input file.')
+    return file_out
+
+
+class _Export(object):
+    """Export the data of a xrdml file, picklable for the worker pool."""
+
+    def __init__(self, output='txt', fmt='%.18e', delimiter='\t', chunk_size=None, direct=True):
+        self.output = output
+        self.fmt = fmt
+        self.delimiter = delimiter
+        self.chunk_size = chunk_size
+        self.direct = direct
+
+    def __call__(self, filename):
+        data = xrdtools.read_xrdml(filename)
+
+        if self.output in EXPORTERS:
+            EXPORTERS[self.output](data, _output_filename(filename, self.output))
+            return None
+
+        columns, labels = _get_columns(data)
+        if columns is None:
+            # stderr, the text of the files on stdout stays in order
+            print('Measurement type of "{}" is not supported.'.format(filename), file=sys.stderr)
+            return None
+
+        if self.output == 'txt':
+            file_out = _output_filename(filename, 'txt')
+        elif self.output == 'stdout':
+            # the workers of a pool return the text to keep the order of the files
+            file_out = sys.stdout if self.direct else io.StringIO()
+
+        _write_txt(file_out, columns, labels, fmt=self.fmt, delimiter=self.delimiter, chunk_size=self.chunk_size)
+        if self.output == 'stdout' and not self.direct:
+            return file_out.getvalue()
+        return None
+
+
+def xrdml(argv=None):
     """Command line tool to export measurement data from xrdml files.
 
     Allowed keyword arguments:
     --------------------------
     -o, --output : str
-        Choices: 'stdout', 'txt' [default: 'txt']
+        Choices: 'stdout', 'txt', 'npz', 'h5', 'parquet' [default: 'txt']
     --delimiter : str
         Default: '\t'
     --fmt : str
         Default: '%.18e'
+    -j, --jobs : int
+        Number of files converted in parallel, 0 for one per CPU [default: 1]
+    --stream
+        Write the rows in chunks instead of stacking all data in memory
     """
 
     parser = ArgumentParser('Export measurement data for xrdml files.')
     parser.add_argument('filenames', metavar='filenames', type=str, nargs='+',
                         help='filenames for which to export the data')
-    parser.add_argument('-o', '--output', metavar='output', choices=['stdout', 'txt'],
+    parser.add_argument('-o', '--output', metavar='output', choices=['stdout', 'txt'] + sorted(EXPORTERS),
                         default='txt',
                         help='the format to which the data should be exported')
     parser.add_argument('--delimiter', metavar='delimiter', type=str, default='\t',
                         help='define a delimiter')
     parser.add_argument('--fmt', metavar='fmt', type=str, default='%.18e',
                         help='define the output format')
+    parser.add_argument('-j', '--jobs', metavar='jobs', type=int, default=1,
+                        help='number of files converted in parallel, 0 for one per CPU')
+    parser.add_argument('--stream', action='store_true',
+                        help='write the rows in chunks instead of stacking all data in memory')
+    parser.add_argument('--chunk-size', metavar='chunk_size', type=int, default=10000,
+                        help='number of rows per chunk in the stream mode')
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+
+    delimiter = codecs.decode(args.delimiter, 'unicode_escape')
+    export = _Export(output=args.output,
+                     fmt=args.fmt,
+                     delimiter=delimiter,
+                     chunk_size=args.chunk_size if args.stream else None,
+                     direct=args.jobs == 1)
+
+    failed = False
+    for k, text, error in _imap(export, args.filenames, workers=args.jobs or None, ordered=True):
+        if error is not None:
+            print('Failed to export "{}": {}'.format(args.filenames[k], error), file=sys.stderr)
+            failed = True
+        elif text is not None:
+            sys.stdout.write(text)
+    if failed:
+        sys.exit(1)
 
-    for filename in args.filenames:
-        data = xrdtools.read_xrdml(filename)
 
-        output = np.array([])
-        labels = []
+def main(argv=None):
+    """Command line tool to manage xrdtools.
 
-        if data['measType'] == 'Scan':
-            output = np.vstack([data['x'], data['data']])
-            labels = [data.get('xlabel', ''), 'Intensity']
+    Commands:
+    ---------
+    cache clear
+        Remove all entries from the cache of parsed xrdml files.
+    cache stats
+        Show the number of entries and the size of the cache.
+    catalog paths
+        Print a table of the settings of the xrdml files in the directories `paths`.
 
-        elif data['measType'] == 'Area measurement':
-            output = np.vstack([data['2Theta'].ravel(), data['Omega'].ravel(), data['data'].ravel()])
-            labels = [data.get('xlabel', ''), data.get('ylabel', ''), 'Intensity']
+    Allowed keyword arguments:
+    --------------------------
+    --cache-dir : str
+        Default: `xrdtools.cache.DEFAULT_CACHE_DIR`
+    -j, --jobs : int
+        Number of files read in parallel by catalog, 0 for one per CPU [default: 0]
+    --delimiter : str
+        Delimiter of the catalog table [default: '\t']
+    """
 
-        else:
-            print('Measurement type is not supported.')
-            continue
+    parser = ArgumentParser('xrdtools')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+    parser_cache = commands.add_parser('cache', help='manage the cache of parsed xrdml files')
+    parser_cache.add_argument('action', metavar='action', choices=['clear', 'stats'],
+                              help='clear the cache or show its statistics')
+    parser_cache.add_argument('--cache-dir', metavar='cache_dir', type=str, default=cache.DEFAULT_CACHE_DIR,
+                              help='the cache directory')
+    parser_catalog = commands.add_parser('catalog', help='print a table of the settings of xrdml files')
+    parser_catalog.add_argument('paths', metavar='paths', type=str, nargs='+',
+                                help='directories (searched recursively) or filenames of xrdml files')
+    parser_catalog.add_argument('-j', '--jobs', metavar='jobs', type=int, default=0,
+                                help='number of files read in parallel, 0 for one per CPU')
+    parser_catalog.add_argument('--delimiter', metavar='delimiter', type=str, default='\t',
+                                help='define a delimiter')
 
-        if args.output == 'txt':
-            file_out = filename.replace('.xrdml', '.txt')
-        elif args.output == 'stdout':
-            file_out = sys.stdout
+    args = parser.parse_args(argv)
 
-        delimiter = args.delimiter.decode('string-escape')
-        fmt = args.fmt
-        np.savetxt(file_out, output.T,
-                   fmt=fmt,
-                   delimiter=delimiter,
-                   header=delimiter.join(labels))
+    if args.command == 'catalog':
+        rows, errors = scan_catalog(args.paths, workers=args.jobs or None)
+        delimiter = codecs.decode(args.delimiter, 'unicode_escape')
+        print(delimiter.join(CATALOG_COLUMNS))
+        for row in rows:
+            if 'hkl' in row:
+                row['hkl'] = ' '.join(str(row['hkl'][hkl]) for hkl in 'hkl')
+            print(delimiter.join('' if row.get(key) is None else str(row[key]) for key in CATALOG_COLUMNS))
+        for filename, error in errors.items():
+            print('Failed to read "{}": {}'.format(filename, error), file=sys.stderr)
+        if errors:
+            sys.exit(1)
+    elif args.action == 'clear':
+        removed = cache.clear(args.cache_dir)
+        print('Removed {} entries from {}'.format(removed, args.cache_dir))
+    elif args.action == 'stats':
+        stats = cache.stats(args.cache_dir)
+        print('cache directory: {}'.format(stats['cache_dir']))
+        print('entries: {}'.format(stats['entries']))
+        print('size: {:.1f} MB'.format(stats['size'] / 2 ** 20))
@@ -3,72 +3,115 @@ from __future__ import unicode_literals, print_function, division, absolute_impo
 import numpy as np
 
 
-def get_qmap(data, omega_offset=0):
+def get_qmap(data, omega_offset=0, out=None, dtype=None, work=None):
     """Function to calculate kpar, kperp.
 
     Parameters
     ----------
     data : dict
         A xrdml data dictionary.
-    omega_offset : float
-        Offset for the omega angle.
+    omega_offset : float or array-like
+        Offset for the omega angle, e.g. one per scan of shape (nb_scans, 1).
+    out : tuple of ndarray, optional
+        Arrays (kpar, kperp) to store the result in, see `angle2qvector`.
+    dtype : dtype, optional
+        The dtype of the result, e.g. `np.float32` [Default: float64].
+    work : ndarray, optional
+        A scratch array, see `angle2qvector`.
 
     Returns
     -------
     kpar : ndarray
     kperp : ndarray
     """
-    om = data['Omega'] + omega_offset
-    lambd = data['Lambda']
-    return angle2qvector(data['2Theta'], om, lambd)
+    return angle2qvector(data['2Theta'], data['Omega'], data['Lambda'], omega_offset=omega_offset,
+                         out=out, dtype=dtype, work=work)
 
 
-def angle2qvector(tt, om, lam=1.54):
+def angle2qvector(tt, om, lam=1.54, omega_offset=0, out=None, dtype=None, work=None):
     """Convert angles to q vector.
 
     Calculate the q-vector from the 2theta `tt` and omega `om` angle and
     the x-ray wavelength lambda `lam`.
 
+    The result is computed in place in the output arrays and one scratch
+    array, so with `out` and `work` given no memory is allocated, e.g. to
+    recompute a map for many values of `omega_offset`.
+
     Parameters
     ----------
     tt : array-like
         Array containing the 2Theta values.
     om : array-like
-        Array containing the Omega values.
+        Array containing the Omega values, broadcastable to `tt`.
     lam : float
         The wavelength lambda in Angstrom [Default: 1.54].
+    omega_offset : float or array-like
+        Offset for the omega angle, broadcastable to `tt` [Default: 0].
+    out : tuple of ndarray, optional
+        Arrays (kpar, kperp) of the broadcast shape of `tt` and `om` to store
+        the result in.
+    dtype : dtype, optional
+        The dtype of the result if `out` is not given, e.g. `np.float32` to
+        halve the memory [Default: float64].
+    work : ndarray, optional
+        A scratch array of the shape and dtype of the result.
 
     Returns
     -------
     kpar : ndarray
     kperp : ndarray
     """
-    # convert degrees to radians
-    tt_rad = np.radians(tt)
-    t_rad = tt_rad / 2.
-    om_rad = np.radians(om)
+    shape = np.broadcast(tt, om).shape
+    if out is None:
+        kpar = np.empty(shape, dtype=dtype or np.float64)
+        kperp = np.empty(shape, dtype=dtype or np.float64)
+    else:
+        kpar, kperp = out
+    if work is None:
+        work = np.empty(shape, dtype=kpar.dtype)
+
+    # theta in radians
+    np.radians(tt, out=work)
+    np.divide(work, 2., out=work)
+
+    # delta = theta - omega
+    if np.any(omega_offset):
+        np.add(om, omega_offset, out=kpar)
+        np.radians(kpar, out=kpar)
+    else:
+        np.radians(om, out=kpar)
+    np.subtract(work, kpar, out=kpar)
+
+    # delta_k = 2 / lambda * sin(theta)
+    np.sin(work, out=work)
+    np.multiply(work, 2. / lam, out=work)
 
     # calculate kpar, kperp
-    delta = t_rad - om_rad
-    delta_k = 2. / lam * np.sin(t_rad)
-
-    kperp = delta_k * np.cos(delta)
-    kpar = delta_k * np.sin(delta)
+    np.cos(kpar, out=kperp)
+    np.multiply(kperp, work, out=kperp)
+    np.sin(kpar, out=kpar)
+    np.multiply(kpar, work, out=kpar)
 
+    if out is None and not shape:
+        return kpar[()], kperp[()]
     return kpar, kperp
 
 
 def q2hkl_map(x, y, lattice_params=(3.905, 3.905, 3.905), hkl=None):
     """Compute the hk coordinates for a given q vector.
 
+    The input arrays are not modified.
+
     Parameters
     ----------
-    x : ndarray
-    y : ndarray
+    x : array-like
+    y : array-like
     lattice_params : tuple
         A tuple of three floats for the lattice parameter.
-    hkl : dict
-        A dictionary containing the hkl values. Defaults to 001 if not given [Default: None].
+    hkl : dict or tuple
+        A dictionary containing the hkl values or a tuple (h, k, l). Defaults to 001 if not given
+        [Default: None].
 
     Returns
     -------
@@ -77,13 +120,21 @@ def q2hkl_map(x, y, lattice_params=(3.905, 3.905, 3.905), hkl=None):
     """
     if hkl is None:
         hkl = {'h': 0, 'k': 0, 'l': 1}
+    h, k, _ = _hkl_tuple(hkl)
     a, b, c = lattice_params
 
-    x /= np.sqrt((hkl['h'] / a) ** 2 + (hkl['k'] / b) ** 2)
-    y *= c
+    x = np.divide(x, np.sqrt((h / a) ** 2 + (k / b) ** 2))
+    y = np.multiply(y, c)
     return x, y
 
 
+def _hkl_tuple(hkl):
+    """Get the (h, k, l) values of a hkl dictionary or sequence."""
+    if isinstance(hkl, dict):
+        return hkl['h'], hkl['k'], hkl['l']
+    return tuple(hkl)
+
+
 def angles(hkl, lam=1.54, lattice_param=(3.905, 3.905, 3.905)):
     """Compute the angle for a given hkl position.
 
@@ -123,3 +174,62 @@ def angles(hkl, lam=1.54, lattice_param=(3.905, 3.905, 3.905)):
     delta = offset_oop
 
     return tt, omega, delta
+
+
+def hkl2angles(hkl, lam=1.54, lattice_params=(3.905, 3.905, 3.905)):
+    """Compute the angles for many hkl positions and lattice parameters at once.
+
+    Vectorized version of `angles` for an array of reflections and
+    optionally several sets of lattice parameters, e.g. to compute the
+    peak positions of a thin film for many strain states.
+
+    Parameters
+    ----------
+    hkl : array-like
+        The hkl indices, shape (N, 3) or (3,).
+    lam : float or array-like
+        The wavelength lambda in Angstrom [Default: 1.54].
+    lattice_params : array-like
+        The lattice parameters (a, b, c), shape (3,) or (M, 3) for M sets of
+        lattice parameters [Default: (3.905, 3.905, 3.905)].
+
+    Returns
+    -------
+    tt : ndarray
+    omega : ndarray
+    delta : ndarray
+        The angles in degrees with shape (N,), or (M, N) for several sets of
+        lattice parameters. NaN if a reflection is not reachable with the
+        wavelength `lam`.
+
+    Examples
+    --------
+    >>> hkl = [[0, 0, 1], [1, 0, 3], [1, 1, 3]]
+    >>> lattice_params = [[3.905, 3.905, 3.905], [3.905, 3.905, 4.0]]
+    >>> tt, omega, delta = hkl2angles(hkl, lam=1.5406, lattice_params=lattice_params)
+    >>> tt.shape
+    (2, 3)
+    """
+    hkl = np.asarray(hkl, dtype=float)
+    lattice_params = np.asarray(lattice_params, dtype=float)
+    if hkl.shape[-1] != 3 or lattice_params.shape[-1] != 3:
+        raise ValueError('The hkl indices and the lattice parameters need a last axis of length 3.')
+    if hkl.ndim == 2 and lattice_params.ndim == 2:
+        # one row per set of lattice parameters
+        lattice_params = lattice_params[:, np.newaxis, :]
+
+    h, k, l_ = hkl[..., 0], hkl[..., 1], hkl[..., 2]
+    a0, a1, a2 = lattice_params[..., 0], lattice_params[..., 1], lattice_params[..., 2]
+
+    # same calculation as `angles`
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d_hkl = 1 / np.sqrt((h / a0) ** 2 + (k / a1) ** 2 + (l_ / a2) ** 2)
+
+        theta = np.degrees(np.arcsin(lam / (2 * d_hkl)))
+        offset_oop = np.degrees(np.arctan(1 / np.sqrt((l_ / a2) ** 2) / (1 / np.sqrt((h / a0) ** 2 + (k / a1) ** 2))))
+
+    tt = 2 * theta
+    omega = theta - offset_oop
+    delta = offset_oop
+
+    return tt, omega, delta